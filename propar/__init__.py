@@ -1,12 +1,18 @@
 __version__ = "1.3.0"
 
 import collections
+import csv
+import itertools
+import json
+import math
+import numbers
+import os
 import serial
 import struct
+import sys
 import threading
 import time
-
-from . import parameters
+import types
 
 # status codes dict, input code, get string
 pp_status_codes = { 0: 'PP_STATUS_OK',
@@ -112,9 +118,124 @@ PP_MODE_ASCII                    =    1  # ASCII mode
 # propar max parameter length (strings)
 MAX_PP_PARM_LEN                  =  248  # max parameter length
 
+
+class _propar_codec(object):
+  """Encodes and decodes the values of one propar parameter type.
+
+  Values are big endian on the wire. Integer values are accepted both signed and
+  unsigned (within minimum and maximum), values out of range are encoded as zero.
+
+  Args:
+    parm_type (int): Propar parameter type handled by this codec.
+    wire_type (int): Propar parameter type used on the wire (INT8, INT16 or INT32).
+    fmt (str): Struct format of the value as represented in python.
+    minimum: Minimum value that can be encoded.
+    maximum: Maximum value that can be encoded.
+  """
+
+  def __init__(self, parm_type, wire_type, fmt, minimum, maximum):
+    self.parm_type = parm_type
+    self.wire_type = wire_type
+    self.wire      = struct.Struct(_PP_WIRE_FORMATS[wire_type])
+    self.struct    = struct.Struct(fmt)
+    self.size      = self.wire.size
+    self.mask      = (1 << (8 * self.size)) - 1
+    self.minimum   = minimum
+    self.maximum   = maximum
+
+  def in_range(self, value):
+    """Check if value can be encoded by this codec."""
+    return isinstance(value, numbers.Integral) and self.minimum <= value <= self.maximum
+
+  def pack_into(self, buffer, pos, value):
+    """Pack value into buffer at pos, returns the position after the value."""
+    if self.in_range(value):
+      self.wire.pack_into(buffer, pos, value & self.mask)
+    else:
+      self.wire.pack_into(buffer, pos, 0)
+    return pos + self.size
+
+  def unpack_from(self, buffer, pos):
+    """Unpack a value of this type from buffer at pos."""
+    return self.struct.unpack_from(buffer, pos)[0]
+
+  def from_wire(self, value):
+    """Reinterpret an (unsigned) wire value as a value of this type."""
+    return self.struct.unpack(self.wire.pack(value))[0]
+
+
+class _propar_float_codec(_propar_codec):
+  """Float codec, floats are sent as INT32 on the wire.
+
+  Values beyond the 32 bit float range are sent as (signed) infinity.
+  """
+
+  def in_range(self, value):
+    return isinstance(value, numbers.Real)
+
+  def pack_into(self, buffer, pos, value):
+    if not self.in_range(value):
+      self.wire.pack_into(buffer, pos, 0)
+    elif value >= self.maximum:
+      self.struct.pack_into(buffer, pos, math.inf)
+    elif value <= self.minimum:
+      self.struct.pack_into(buffer, pos, -math.inf)
+    else:
+      self.struct.pack_into(buffer, pos, value)
+    return pos + self.size
+
+
+class _propar_bsint_codec(_propar_codec):
+  """Bronkhorst signed integer codec, 41942 max, -23593 min."""
+
+  def unpack_from(self, buffer, pos):
+    return self.from_wire(self.wire.unpack_from(buffer, pos)[0])
+
+  def from_wire(self, value):
+    if value > 0xA3D6: # 41942
+      return (0xFFFF - value) * (-1)
+    return value
+
+
+# struct formats of the propar wire types (big endian, unsigned)
+_PP_WIRE_FORMATS = {PP_TYPE_INT8 : '>B',
+                    PP_TYPE_INT16: '>H',
+                    PP_TYPE_INT32: '>I'}
+
+# largest magnitude that does not round to infinity as a 32 bit float
+_PP_FLOAT_LIMIT = (2 - 2 ** -24) * 2 ** 127
+
+# codecs per propar parameter type (strings are handled by the message builder/reader)
+_PP_CODECS = {PP_TYPE_INT8   : _propar_codec      (PP_TYPE_INT8   , PP_TYPE_INT8 , '>B',       -0x80,       0xFF),
+              PP_TYPE_INT16  : _propar_codec      (PP_TYPE_INT16  , PP_TYPE_INT16, '>H',     -0x8000,     0xFFFF),
+              PP_TYPE_SINT16 : _propar_codec      (PP_TYPE_SINT16 , PP_TYPE_INT16, '>h',     -0x8000,     0xFFFF),
+              PP_TYPE_BSINT16: _propar_bsint_codec(PP_TYPE_BSINT16, PP_TYPE_INT16, '>H',     -0x8000,     0xFFFF),
+              PP_TYPE_INT32  : _propar_codec      (PP_TYPE_INT32  , PP_TYPE_INT32, '>I', -0x80000000, 0xFFFFFFFF),
+              PP_TYPE_FLOAT  : _propar_float_codec(PP_TYPE_FLOAT  , PP_TYPE_INT32, '>f', -_PP_FLOAT_LIMIT, _PP_FLOAT_LIMIT)}
+
+# Processes that are repeated per channel (process number + channel - 1)
+_PP_CHANNEL_PROCESSES = (1, 33, 65, 97, 104)
+
+# Maximum length of propar message data, and the expected length of strings with unknown length
+_PP_MAX_MESSAGE_LEN      = 255
+_PP_STRING_SIZE_ESTIMATE = 32
+
 # List of initialized masters
 _PROPAR_MASTERS = {}
 
+# Shared parameter database, created on first use
+_DATABASE      = None
+_DATABASE_LOCK = threading.Lock()
+
+
+def _shared_database():
+  """Get the process wide parameter database, it is created on first use."""
+  global _DATABASE
+  if _DATABASE is None:
+    with _DATABASE_LOCK:
+      if _DATABASE is None:
+        _DATABASE = database()
+  return _DATABASE
 
 class instrument(object):
   """Implements a propar instrument for easy access to instrument parameters.
@@ -133,13 +254,17 @@ class instrument(object):
     address (int): Address of the instrument
     comport (str): COM port on which the instrument is connected
     master (obj): Instance of the master class used for communication.
-    db (obj): Instance of the propar database, for conversion from DDE number to process, parameter number.
+    db (obj): Instance of the propar database (of the master, unless set), for conversion from DDE number to process, parameter number.
+    cache (obj): Optional parameter_cache instance. When set, readParameter (and the properties) return
+      cached values until these expire. Written parameters are invalidated, broadcasts refresh the cache.
   """
 
   def __init__(self, comport, address=0x80, baudrate=38400, channel=1, serial_class=serial.Serial):
     self.address = address
     self.comport = comport
     self.channel = channel
+    self.__db    = None
+    self.__cache = None
     if comport in _PROPAR_MASTERS:
       # Master already created previously
       self.master = _PROPAR_MASTERS[comport]
@@ -147,7 +272,67 @@ class instrument(object):
       # No master, create it and store it
       self.master = master(comport, baudrate, serial_class=serial_class)
       _PROPAR_MASTERS[comport] = self.master
-    self.db = self.master.db
+
+  @property
+  def db(self):
+    """Propar database of the instrument (the database of the master, unless set)."""
+    if self.__db is None:
+      return self.master.db
+    return self.__db
+
+  @db.setter
+  def db(self, value):
+    self.__db = value
+
+  @property
+  def cache(self):
+    """Parameter value cache (disabled when None)."""
+    return self.__cache
+
+  @cache.setter
+  def cache(self, value):
+    if self.__cache is not None:
+      self.master.broadcast_listeners.remove(self.__broadcast_received)
+    self.__cache = value
+    if value is not None:
+      self.master.broadcast_listeners.append(self.__broadcast_received)
+
+  def __cache_key(self, parm, channel=None):
+    """Get the cache key (dde_nr, channel) of a database parameter, channel is None when not used by the parameter."""
+    if parm['proc_nr'] not in _PP_CHANNEL_PROCESSES:
+      return (parm['dde_nr'], None)
+    if channel == None:
+      channel = self.channel
+    return (parm['dde_nr'], channel if channel >= 1 and channel <= 16 else 1)
+
+  def __broadcast_received(self, node, parameters):
+    """Refresh the cache with the (raw) parameters of a broadcast of this instrument."""
+    if node != self.address:
+      return
+    propar_dict = self.db.propar_dict
+    for recv_parm in parameters:
+      proc_nr = recv_parm['proc_nr']
+      parm_nr = recv_parm['parm_nr']
+      channel = None
+      parm    = propar_dict.get((proc_nr, parm_nr))
+      if parm is None:
+        # Parameter of another channel
+        for process in _PP_CHANNEL_PROCESSES:
+          if process < proc_nr < process + 16:
+            channel = proc_nr - process + 1
+            parm    = propar_dict.get((process, parm_nr))
+            break
+      if parm is None or recv_parm['data'] is None:
+        continue
+      data = recv_parm['data']
+      if recv_parm['parm_type'] != parm['parm_type']:
+        codec = _PP_CODECS.get(parm['parm_type'])
+        if codec is None or codec.wire_type != recv_parm['parm_type']:
+          continue
+        data = codec.from_wire(data)
+      if channel is None and parm['proc_nr'] in _PP_CHANNEL_PROCESSES:
+        channel = 1
+      self.__cache.put((parm['dde_nr'], channel), data)
 
   def __modify_parameter_channel(self, parm, channel=None):
     """Adjust the parameter definition for current channel.
@@ -162,7 +347,7 @@ class instrument(object):
     if channel == None:
       channel = self.channel
     if channel >= 1 and channel <= 16:
-      if parm['proc_nr'] in [1, 33, 65, 97, 104]:
+      if parm['proc_nr'] in _PP_CHANNEL_PROCESSES:
         parm = dict(parm)
         parm['proc_nr'] += channel - 1
     return parm
@@ -178,12 +363,19 @@ class instrument(object):
       Parameter data if successful, None otherwise.
     """
     try:
-      parm = self.db.get_parameter(dde_nr)
+      parm = self.db.get_parameter(dde_nr, copy=False)
     except:
       raise ValueError('DDE parameter number error!')
+    if self.__cache is not None:
+      key  = self.__cache_key(parm, channel)
+      data = self.__cache.get(key)
+      if data is not None:
+        return data
     resp = self.read_parameters([parm], channel=channel)
     if resp != None:
       for r in resp:
+        if self.__cache is not None and r['status'] == PP_STATUS_OK:
+          self.__cache.put(key, r['data'])
         return r['data']
     else:
       return None
@@ -200,13 +392,388 @@ class instrument(object):
       True if successful, False otherwise.
     """
     try:
-      parm = self.db.get_parameter(dde_nr)
+      parm = dict(self.db.get_parameter(dde_nr, copy=False), data=data)
+    except:
+      raise ValueError('DDE parameter number error!')
+    resp = self.write_parameters([parm], channel=channel)
+    return (resp == PP_STATUS_OK)
+
+  def readParameters(self, dde_nrs, channel=None):
+    """Read multiple parameters indicated by DDE nr, packed into the minimum number of (chained) messages.
+
+    Args:
+      dde_nrs (list:int): FlowDDE parameter numbers.
+      channel (int, optional): Channel to use for communication.
+
+    Returns:
+      Dict with the parameter data (None if not successful) per DDE nr.
+    """
+    try:
+      parms = self.db.get_parameters(dde_nrs, copy=False)
+    except:
+      raise ValueError('DDE parameter number error!')
+    return dict(zip(dde_nrs, self.__read_packed([(parm, channel) for parm in parms])))
+
+  def readChannels(self, dde_nrs, channels):
+    """Read one or more parameters indicated by DDE nr on multiple channels, packed into the minimum
+    number of (chained) messages (for all channels together).
+
+    Args:
+      dde_nrs (int or list:int): FlowDDE parameter number(s).
+      channels (list:int): Channels to read the parameters of.
+
+    Returns:
+      Dict with per channel the parameter data (None if not successful) for a single DDE nr,
+      or a dict with the parameter data per DDE nr for a list of DDE nrs.
+    """
+    single = isinstance(dde_nrs, numbers.Integral)
+    if single:
+      dde_nrs = [dde_nrs]
+    try:
+      parms = self.db.get_parameters(dde_nrs, copy=False)
+    except:
+      raise ValueError('DDE parameter number error!')
+    data    = iter(self.__read_packed([(parm, channel) for channel in channels for parm in parms]))
+    results = {channel: dict(zip(dde_nrs, data)) for channel in channels}
+    if single:
+      return {channel: values[dde_nrs[0]] for channel, values in results.items()}
+    return results
+
+  def __read_packed(self, requests):
+    """Read (database parameter, channel) pairs with a packed read, using the cache when enabled.
+
+    Returns:
+      List with the parameter data (None if not successful) per request.
+    """
+    results = [None] * len(requests)
+    pending = list(range(len(requests)))
+    if self.__cache is not None:
+      keys    = [self.__cache_key(parm, channel) for parm, channel in requests]
+      results = [self.__cache.get(key) for key in keys]
+      pending = [i for i, data in enumerate(results) if data is None]
+    if pending:
+      request = [self.__modify_parameter_channel(*requests[i]) for i in pending]
+      request[0] = dict(request[0], node=self.address)
+      for i, r in zip(pending, self.master.read_parameters_packed(request)):
+        if r['status'] == PP_STATUS_OK:
+          results[i] = r['data']
+          if self.__cache is not None:
+            self.__cache.put(keys[i], r['data'])
+    return results
+
+  def writeParameters(self, values, channel=None):
+    """Write multiple parameters indicated by DDE nr, packed into the minimum number of (chained) messages.
+    Parameters are written in the given order.
+
+    Args:
+      values (dict): Parameter data to write per FlowDDE parameter number.
+      channel (int, optional): Channel to use for communication.
+
+    Returns:
+      True if successful, False otherwise.
+    """
+    try:
+      parms = [dict(self.db.get_parameter(dde_nr, copy=False), data=data) for dde_nr, data in values.items()]
+    except:
+      raise ValueError('DDE parameter number error!')
+    if not parms:
+      return True
+    if self.__cache is not None:
+      self.__invalidate(parms, channel)
+    parms = [self.__modify_parameter_channel(parm, channel) for parm in parms]
+    parms[0] = dict(parms[0], node=self.address)
+    return self.master.write_parameters_packed(parms) == PP_STATUS_OK
+
+  def configure(self, desired, tolerance=0, channel=None):
+    """Apply a configuration, only writing the parameters that differ from the desired values.
+    Current values are read packed, changed parameters are written packed (in the given order),
+    and read back packed to verify the changes.
+
+    Floats are compared with the desired value as sent (rounded to a 32 bit float), with tolerance.
+    Strings are compared without trailing spaces and zeros (padding).
+    Parameters that could not be read are written.
+
+    Args:
+      desired (dict): Desired parameter data per FlowDDE parameter number or parameter name.
+      tolerance (float, optional): Maximum difference for numeric values to be considered equal.
+      channel (int, optional): Channel to use for communication.
+
+    Returns:
+      Dict with 'unchanged' (list of keys already at the desired value), 'changed' (dict with
+      (old value, new value) per written key), 'failed' (dict with (desired value, read back value)
+      per written key that did not verify), and 'success' (True when all changes verified).
+    """
+    parms = []
+    for key in desired:
+      if isinstance(key, str):
+        parms.append(self.__get_parameter_by_name(key))
+      else:
+        try:
+          parms.append(self.db.get_parameter(key, copy=False))
+        except:
+          raise ValueError('DDE parameter number error!')
+    if self.__cache is not None:
+      self.__invalidate(parms, channel)
+    current = self.__read_packed([(parm, channel) for parm in parms])
+
+    report  = {'unchanged': [], 'changed': {}, 'failed': {}, 'success': True}
+    changes = []
+    for (key, data), parm, value in zip(desired.items(), parms, current):
+      if value is not None and self.__same_value(parm, value, data, tolerance):
+        report['unchanged'].append(key)
+      else:
+        report['changed'][key] = (value, data)
+        changes.append((key, parm, data))
+    if not changes:
+      return report
+
+    written = [parm for key, parm, data in changes]
+    if self.__cache is not None:
+      self.__invalidate(written, channel)
+    writes    = [self.__modify_parameter_channel(dict(parm, data=data), channel) for key, parm, data in changes]
+    writes[0] = dict(writes[0], node=self.address)
+    self.master.write_parameters_packed(writes, fallback=True)
+
+    if self.__cache is not None:
+      self.__invalidate(written, channel)
+    read_back = self.__read_packed([(parm, channel) for key, parm, data in changes])
+    for (key, parm, data), value in zip(changes, read_back):
+      if value is None or not self.__same_value(parm, value, data, tolerance):
+        report['failed'][key] = (data, value)
+    report['success'] = not report['failed']
+    return report
+
+  @staticmethod
+  def __same_value(parm, value, data, tolerance):
+    """Compare a read value with the desired data, for floats with the data as sent, for strings without padding."""
+    if isinstance(value, numbers.Real) and isinstance(data, numbers.Real):
+      codec = _PP_CODECS.get(parm['parm_type'])
+      if parm['parm_type'] == PP_TYPE_FLOAT and codec is not None and codec.in_range(data):
+        buffer = bytearray(codec.size)
+        codec.pack_into(buffer, 0, data)
+        data   = codec.unpack_from(buffer, 0)
+      return abs(value - data) <= tolerance
+    if parm['parm_type'] == PP_TYPE_STRING and isinstance(value, str) and isinstance(data, str):
+      return value.rstrip(' \x00') == data.rstrip(' \x00')
+    return value == data
+
+  def snapshot(self, path=None, dde_nrs=None, channel=None):
+    """Read all (or the given) parameters of the instrument, to back up its settings (see restore).
+    Parameters are read packed, one parameter per process and parameter number. When availability is
+    set on the master, parameters that are unavailable on the device are skipped.
+
+    Args:
+      path (str, optional): JSON file to save the snapshot to.
+      dde_nrs (list:int, optional): FlowDDE parameter numbers to read (all parameters of the database when None).
+      channel (int, optional): Channel to use for communication.
+
+    Returns:
+      The parameter_snapshot, with the data per DDE nr of the parameters that were read successfully.
+    """
+    if dde_nrs is None:
+      parms = [parm for parm in self.db.get_all_parameters(copy=False)
+               if self.db.propar_dict[(parm['proc_nr'], parm['parm_nr'])]['dde_nr'] == parm['dde_nr']]
+    else:
+      try:
+        parms = self.db.get_parameters(dde_nrs, copy=False)
+      except:
+        raise ValueError('DDE parameter number error!')
+    data = {}
+    if parms:
+      request    = [self.__modify_parameter_channel(parm, channel) for parm in parms]
+      request[0] = dict(request[0], node=self.address)
+      data       = {parm['dde_nr']: resp['data'] for parm, resp in zip(parms, self.master.read_parameters_packed(request))
+                    if resp['status'] == PP_STATUS_OK}
+    snapshot   = parameter_snapshot(data, channel)
+    if path is not None:
+      snapshot.save(path)
+    return snapshot
+
+  def restore(self, snapshot, unlock=False, force=False, channel=None):
+    """Write the settings of a snapshot back to the instrument (see snapshot).
+    Only the configuration parameters in parameter_snapshot.RESTORE are restored (parameters marked not
+    writable in the database are skipped), in the order of its stages. Parameters are only written when
+    they differ from the instrument (see configure).
+
+    Args:
+      snapshot (obj or str): parameter_snapshot, or JSON file to load it from.
+      unlock (bool, optional): Write init reset 64 (enable changes of secured parameters) before, and 82 after restoring.
+      force (bool, optional): Restore to an instrument of another device type than the snapshot.
+      channel (int, optional): Channel to use for communication.
+
+    Returns:
+      Report of the changes, see configure.
+    """
+    if isinstance(snapshot, str):
+      snapshot = parameter_snapshot.load(snapshot)
+    device_type = snapshot.parameters.get(90)
+    if not force and device_type is not None and self.readParameter(90, channel=channel) != device_type:
+      raise ValueError('Snapshot device type error! ({})'.format(device_type))
+    stages = []
+    for stage in parameter_snapshot.RESTORE:
+      stages.append({dde_nr: snapshot.parameters[dde_nr] for dde_nr in stage
+                     if dde_nr in snapshot.parameters and dde_nr in self.db.dde_dict and self.db.dde_dict[dde_nr].get('writable') is not False})
+
+    report = {'unchanged': [], 'changed': {}, 'failed': {}, 'success': True}
+    if unlock:
+      self.writeParameters({7: 64}, channel)
+    try:
+      for stage in stages:
+        if stage:
+          result = self.configure(stage, channel=channel)
+          report['unchanged'] += result['unchanged']
+          report['changed'  ].update(result['changed'])
+          report['failed'   ].update(result['failed'])
+    finally:
+      if unlock:
+        self.writeParameters({7: 82}, channel)
+    report['success'] = not report['failed']
+    return report
+
+  def stream_setpoint(self, dde_nr=206, verify_period=1.0, tolerance=0, drift_callback=None, channel=None):
+    """Create a stream for high rate setpoint updates, which are written without acknowledge.
+    If the previous value is still being sent, only the latest value is sent (last value wins).
+    The setpoint is periodically read back to detect drift (see setpoint_stream).
+
+    Args:
+      dde_nr (int, optional): FlowDDE parameter number of the setpoint (default fSetpoint, 9 for setpoint 0-32000).
+      verify_period (float, optional): Period of the read back verification in seconds (None to disable).
+      tolerance (float, optional): Maximum difference between the written and read back value.
+      drift_callback (func, optional): Function called with (stream, written value, read back value) on drift.
+      channel (int, optional): Channel to use for communication.
+
+    Returns:
+      The setpoint_stream, use setpoint_stream.write to write values.
+    """
+    try:
+      parm = self.db.get_parameter(dde_nr, copy=False)
+    except:
+      raise ValueError('DDE parameter number error!')
+    return setpoint_stream(self, parm, verify_period, tolerance, drift_callback, channel)
+
+  def ramp_setpoint(self, target, duration, curve='linear', dde_nr=206, start=None, interval=0.1, unacked=False, callback=None, channel=None):
+    """Ramp the setpoint from the current value to a target, for instruments without setpoint slope.
+    Setpoints are written by the polling scheduler of the master (see setpoint_ramp), so ramps of
+    many instruments share one thread.
+
+    Args:
+      target (float): Setpoint at the end of the ramp.
+      duration (float): Duration of the ramp in seconds.
+      curve (str or list, optional): 'linear', 's-curve' or a step table (see setpoint_ramp).
+      dde_nr (int, optional): FlowDDE parameter number of the setpoint (default fSetpoint, 9 for setpoint 0-32000).
+      start (float, optional): Setpoint at the start of the ramp (read from the instrument when None).
+      interval (float, optional): Time between setpoint writes in seconds.
+      unacked (bool, optional): Write setpoints without acknowledge (see setpoint_stream).
+      callback (func, optional): Function called with (ramp) when the ramp is finished.
+      channel (int, optional): Channel to use for communication.
+
+    Returns:
+      The setpoint_ramp, use setpoint_ramp.wait to wait for the end of the ramp.
+    """
+    try:
+      parm = self.db.get_parameter(dde_nr, copy=False)
+    except:
+      raise ValueError('DDE parameter number error!')
+    return setpoint_ramp(self, parm, target, duration, curve, start, interval, unacked, callback, channel)
+
+  def subscribe(self, dde_nr, period, callback=None, queue=None, channel=None, change_filter=None):
+    """Periodically read a parameter indicated by DDE nr, with the polling scheduler of the master.
+    Parameters of all subscriptions of a node that are due at the same time are read together.
+
+    Args:
+      dde_nr (int): FlowDDE parameter number.
+      period (float): Period in seconds.
+      callback (func, optional): Function called with (subscription, result) after each read.
+      queue (obj, optional): Queue to put (subscription, result) in after each read.
+      channel (int, optional): Channel to use for communication.
+      change_filter (obj, optional): change_filter, to only pass on results when the value changed.
+
+    Returns:
+      The poll_subscription (see master.unsubscribe).
+    """
+    try:
+      parm = self.db.get_parameter(dde_nr, copy=False)
     except:
       raise ValueError('DDE parameter number error!')
-    parm['data'] = data
+    return self.master.subscribe(self.address, self.__modify_parameter_channel(parm, channel), period, callback, queue, change_filter)
+
+  def subscribe_changes(self, dde_nr, period, callback=None, queue=None, deadband=None, percent=None, min_interval=0.0, channel=None):
+    """Periodically read a parameter indicated by DDE nr, and only pass on the value when it changed.
+    Without deadband and percent every change is passed on (for example for alarm words).
+
+    Args:
+      dde_nr (int): FlowDDE parameter number.
+      period (float): Period in seconds (time between reads).
+      callback (func, optional): Function called with (subscription, result) when the value changed.
+      queue (obj, optional): Queue to put (subscription, result) in when the value changed.
+      deadband (float, optional): Minimum absolute change.
+      percent (float, optional): Minimum change in percent of the last passed on value.
+      min_interval (float, optional): Minimum time between passed on values (bursts of changes are coalesced).
+      channel (int, optional): Channel to use for communication.
+
+    Returns:
+      The poll_subscription (see master.unsubscribe).
+    """
+    return self.subscribe(dde_nr, period, callback, queue, channel, change_filter(deadband, percent, min_interval))
+
+  def read_by_name(self, names, channel=None):
+    """Read one or more parameters indicated by (case and space insensitive) name.
+
+    Args:
+      names (str, list:str or parameter_read_plan): Parameter name, list of parameter names,
+        or read plan (see compile_read_plan) to read.
+      channel (int, optional): Channel to use for communication (not used for read plans).
+
+    Returns:
+      For a single name: Parameter data if successful, None otherwise.
+      For a list of names or a read plan: Dict with the parameter data (None if not successful) per name.
+    """
+    if isinstance(names, str):
+      parm = self.__get_parameter_by_name(names)
+      resp = self.read_parameters([parm], channel=channel)
+      for r in resp:
+        return r['data']
+    if not isinstance(names, parameter_read_plan):
+      names = self.compile_read_plan(names, channel=channel)
+    return names()
+
+  def write_by_name(self, name, data, channel=None):
+    """Write a single parameter indicated by (case and space insensitive) name.
+
+    Args:
+      name (str): Parameter name.
+      data: Parameter data to write.
+      channel (int, optional): Channel to use for communication.
+
+    Returns:
+      True if successful, False otherwise.
+    """
+    parm = dict(self.__get_parameter_by_name(name), data=data)
     resp = self.write_parameters([parm], channel=channel)
     return (resp == PP_STATUS_OK)
 
+  def compile_read_plan(self, names, channel=None):
+    """Compile a list of parameter names into a read plan, which reads the parameters packed in as few requests as possible.
+    Names are resolved once, so the plan can be reused for repeated reads (see read_by_name).
+
+    Args:
+      names (list:str): Parameter names.
+      channel (int, optional): Channel to use for communication.
+
+    Returns:
+      A parameter_read_plan object, call it (or pass it to read_by_name) to read the parameters.
+    """
+    parameters = [self.__modify_parameter_channel(self.__get_parameter_by_name(name), channel) for name in names]
+    parameters[0] = dict(parameters[0], node=self.address)
+    return parameter_read_plan(self.master, list(names), parameters)
+
+  def __get_parameter_by_name(self, name):
+    """Get the (read-only) database parameter with the given name."""
+    try:
+      return self.db.get_parameter_by_name(name, copy=False)
+    except KeyError:
+      raise ValueError('Parameter name error! ({})'.format(name))
+
   def read_parameters(self, parameters, callback=None, channel=None):
     """Read multiple parameters.
 
@@ -218,8 +785,8 @@ class instrument(object):
     Returns:
       List with parameters with data if successful, list with one status item otherwise.
     """
-    parameters[0]['node'] = self.address
     parameters = [self.__modify_parameter_channel(parm, channel) for parm in parameters]
+    parameters[0] = dict(parameters[0], node=self.address)
     return self.master.read_parameters(parameters, callback)
 
   def write_parameters(self, parameters, command=PP_COMMAND_SEND_PARM_WITH_ACK, callback=None, channel=None):
@@ -234,10 +801,21 @@ class instrument(object):
     Returns:
       Propar status code (0 if successful).
     """
-    parameters[0]['node'] = self.address
+    if self.__cache is not None:
+      self.__invalidate(parameters, channel)
     parameters = [self.__modify_parameter_channel(parm, channel) for parm in parameters]
+    parameters[0] = dict(parameters[0], node=self.address)
     return self.master.write_parameters(parameters, command, callback)
 
+  def __invalidate(self, parameters, channel=None):
+    """Invalidate the cached values of the (written) parameters."""
+    for parm in parameters:
+      if 'dde_nr' not in parm:
+        parm = self.db.propar_dict.get((parm['proc_nr'], parm['parm_nr']))
+        if parm is None:
+          continue
+      self.__cache.invalidate(self.__cache_key(parm, channel))
+
   def read(self, proc_nr, parm_nr, parm_type):
     """Read a single parameter.
 
@@ -318,6 +896,311 @@ class instrument(object):
 
 
 
+class parameter_cache(object):
+  """Cache of parameter values of an instrument, with a time to live (TTL) per parameter.
+  Values are cached by (DDE nr, channel), see instrument.cache.
+
+  Args:
+    ttl (float, optional): Default time to live of cached values in seconds.
+    ttls (dict, optional): Time to live per DDE nr in seconds, None for values that never expire.
+  """
+
+  # Identity parameters that never change (ID string, device type, model number, serial number,
+  # customer model, firmware version, identification number), these never expire.
+  STATIC = (1, 90, 91, 92, 93, 105, 175)
+
+  def __init__(self, ttl=0.1, ttls=None):
+    self.ttl    = ttl
+    self.ttls   = dict.fromkeys(self.STATIC)
+    self.values = {}
+    if ttls is not None:
+      self.ttls.update(ttls)
+
+  def get(self, key):
+    """Get a cached value.
+
+    Args:
+      key (tuple): Cache key (DDE nr, channel).
+
+    Returns:
+      The cached value, or None when not cached or expired.
+    """
+    entry = self.values.get(key)
+    if entry is None:
+      return None
+    data, expires = entry
+    if expires is not None and time.monotonic() > expires:
+      return None
+    return data
+
+  def put(self, key, data):
+    """Cache a value.
+
+    Args:
+      key (tuple): Cache key (DDE nr, channel).
+      data: Parameter value.
+    """
+    ttl = self.ttls.get(key[0], self.ttl)
+    self.values[key] = (data, None if ttl is None else time.monotonic() + ttl)
+
+  def invalidate(self, key=None):
+    """Invalidate a cached value (or all cached values when key is None)."""
+    if key is None:
+      self.values.clear()
+    else:
+      self.values.pop(key, None)
+
+
+
+
+class setpoint_stream(object):
+  """High rate stream of (setpoint) values to an instrument, see instrument.stream_setpoint.
+
+  Values are written without acknowledge (PP_COMMAND_SEND_PARM), so write never waits for a reply.
+  When a value is written while the previous value is still being sent, only the latest value is
+  sent afterwards (last value wins). The value is periodically read back (with the polling scheduler
+  of the master) to verify the instrument follows the stream.
+
+  Args:
+    instrument (obj): Instrument to stream the values to.
+    parameter (dict): Parameter object to write.
+    verify_period (float, optional): Period of the read back verification in seconds (None to disable).
+    tolerance (float, optional): Maximum difference between the written and read back value.
+    drift_callback (func, optional): Function called with (stream, written value, read back value) on drift.
+    channel (int, optional): Channel to use for communication.
+
+  Attributes:
+    sent (int): Number of values sent.
+    coalesced (int): Number of values that were replaced by a later value before being sent.
+    verifications (int): Number of read backs.
+    drifts (int): Number of read backs that differed more than tolerance from the written value.
+    last_drift (tuple): Last (written value, read back value) that differed, or None.
+  """
+  def __init__(self, instrument, parameter, verify_period=1.0, tolerance=0, drift_callback=None, channel=None):
+    self.instrument     = instrument
+    self.parameter      = parameter
+    self.tolerance      = tolerance
+    self.drift_callback = drift_callback
+    self.channel        = channel
+    self.sent           = 0
+    self.coalesced      = 0
+    self.verifications  = 0
+    self.drifts         = 0
+    self.last_drift     = None
+    self.__value        = None
+    self.__pending      = False
+    self.__written      = None
+    self.__writes       = 0
+    self.__send_lock    = threading.Lock()
+    self.__job          = None
+    if verify_period is not None:
+      self.__job = instrument.master.scheduler.add_job(verify_period, self.verify)
+
+  def write(self, value):
+    """Write a value to the stream (returns directly, does not wait for the instrument)."""
+    if self.__pending:
+      self.coalesced += 1
+    self.__value   = value
+    self.__pending = True
+    # When another thread is sending, it will also send this value
+    while self.__pending and self.__send_lock.acquire(blocking=False):
+      try:
+        while self.__pending:
+          self.__pending = False
+          value = self.__value
+          self.instrument.write_parameters([dict(self.parameter, data=value)], PP_COMMAND_SEND_PARM, channel=self.channel)
+          self.__written = value
+          self.__writes += 1
+          self.sent     += 1
+      finally:
+        self.__send_lock.release()
+
+  def verify(self):
+    """Read back the value and compare it with the last written value (called periodically).
+
+    Returns:
+      The difference between read back and written value, None when not verified.
+    """
+    written = self.__written
+    writes  = self.__writes
+    if written is None:
+      return None
+    resp = self.instrument.read_parameters([self.parameter], channel=self.channel)[0]
+    # Only compare when no value was written during the read back
+    if resp['status'] != PP_STATUS_OK or writes != self.__writes:
+      return None
+    self.verifications += 1
+    expected = written
+    codec    = _PP_CODECS.get(self.parameter['parm_type'])
+    if codec is not None and codec.in_range(written):
+      # compare with the value as sent (for example rounded to a 32 bit float)
+      buffer   = bytearray(codec.size)
+      codec.pack_into(buffer, 0, written)
+      expected = codec.unpack_from(buffer, 0)
+    drift = resp['data'] - expected
+    if abs(drift) > self.tolerance:
+      self.drifts    += 1
+      self.last_drift = (written, resp['data'])
+      if self.drift_callback is not None:
+        self.drift_callback(self, written, resp['data'])
+    return drift
+
+  def close(self):
+    """Stop the read back verification of the stream."""
+    if self.__job is not None:
+      self.instrument.master.scheduler.unsubscribe(self.__job)
+      self.__job = None
+
+
+
+
+class setpoint_ramp(object):
+  """Ramp of a setpoint to a target, see instrument.ramp_setpoint.
+
+  The setpoint is written periodically by a job of the polling scheduler of the master, so ramps of
+  many instruments share the scheduler thread. Each setpoint is calculated from the time elapsed since
+  the start of the ramp (monotonic clock), so late writes do not delay the rest of the ramp.
+  Setpoints are only written when they differ from the previously written setpoint.
+
+  The curve is either 'linear', 's-curve' (smooth start and end), or a step table: a list of
+  (fraction of duration, fraction of the change from start to target) points. With a step table
+  the setpoint holds the value of the last passed point, for example [(0, 0.5), (0.5, 1.0)] writes
+  the setpoint halfway to the target at the start, and the target after half of the duration.
+
+  Args:
+    instrument (obj): Instrument to ramp the setpoint of.
+    parameter (dict): Parameter object of the setpoint.
+    target (float): Setpoint at the end of the ramp.
+    duration (float): Duration of the ramp in seconds.
+    curve (str or list, optional): 'linear', 's-curve' or a step table.
+    start (float, optional): Setpoint at the start of the ramp (read from the instrument when None).
+    interval (float, optional): Time between setpoint writes in seconds.
+    unacked (bool, optional): Write setpoints without acknowledge (see setpoint_stream).
+    callback (func, optional): Function called with (ramp) when the ramp is finished.
+    channel (int, optional): Channel to use for communication.
+
+  Attributes:
+    value: Last written setpoint.
+    writes (int): Number of setpoints written.
+    failures (int): Number of acknowledged writes that failed.
+    finished (bool): True when the target is written or the ramp is cancelled.
+  """
+
+  CURVES = ('linear', 's-curve')
+
+  def __init__(self, instrument, parameter, target, duration, curve='linear', start=None, interval=0.1, unacked=False, callback=None, channel=None):
+    if not isinstance(curve, str):
+      curve = sorted(curve)
+    elif curve not in self.CURVES:
+      raise ValueError('Unknown ramp curve!')
+    self.instrument = instrument
+    self.parameter  = parameter
+    self.target     = target
+    self.duration   = duration
+    self.curve      = curve
+    self.callback   = callback
+    self.channel    = channel
+    self.value      = None
+    self.writes     = 0
+    self.failures   = 0
+    self.finished   = False
+    self.__done     = threading.Event()
+    self.__stream   = None
+    if unacked:
+      self.__stream = setpoint_stream(instrument, parameter, verify_period=None, channel=channel)
+    if start is None:
+      resp = instrument.read_parameters([parameter], channel=channel)[0]
+      if resp['status'] != PP_STATUS_OK:
+        raise Exception('Unable to read the setpoint at the start of the ramp!')
+      start = resp['data']
+    self.start   = start
+    self.__begin = time.monotonic()
+    self.__job   = instrument.master.scheduler.add_job(interval, self.step)
+
+  def setpoint(self, elapsed):
+    """Get the setpoint of the ramp at a time (in seconds) since the start of the ramp."""
+    fraction = min(1.0, elapsed / self.duration) if self.duration > 0 else 1.0
+    if self.curve == 'linear':
+      progress = fraction
+    elif self.curve == 's-curve':
+      progress = fraction * fraction * (3.0 - 2.0 * fraction)
+    else:
+      progress = 0.0
+      for point, point_progress in self.curve:
+        if point > fraction:
+          break
+        progress = point_progress
+      if fraction >= 1.0:
+        progress = 1.0
+    value = self.start + (self.target - self.start) * progress
+    if self.parameter['parm_type'] != PP_TYPE_FLOAT:
+      value = int(round(value))
+    return value
+
+  def step(self):
+    """Write the setpoint for the current time (called periodically)."""
+    if self.finished:
+      return
+    elapsed = time.monotonic() - self.__begin
+    value   = self.setpoint(elapsed)
+    if value != self.value:
+      if self.__stream is not None:
+        self.__stream.write(value)
+      elif self.instrument.write_parameters([dict(self.parameter, data=value)], channel=self.channel) != PP_STATUS_OK:
+        self.failures += 1
+      self.value   = value
+      self.writes += 1
+    if elapsed >= self.duration:
+      self.__finish()
+
+  def cancel(self):
+    """Stop the ramp, the setpoint keeps the last written value."""
+    if not self.finished:
+      self.__finish()
+
+  def wait(self, timeout=None):
+    """Wait until the ramp is finished.
+
+    Returns:
+      True when finished, False on timeout.
+    """
+    return self.__done.wait(timeout)
+
+  def __finish(self):
+    self.finished = True
+    self.instrument.master.scheduler.unsubscribe(self.__job)
+    self.__done.set()
+    if self.callback is not None:
+      self.callback(self)
+
+
+
+
+class parameter_read_plan(object):
+  """Precompiled (packed) read of a list of parameters by name, see instrument.compile_read_plan.
+
+  Args:
+    master (obj): Master used for communication.
+    names (list:str): Names of the parameters, in order of parameters.
+    parameters (list): Parameter objects to read (for node and channel).
+  """
+  def __init__(self, master, names, parameters):
+    self.master     = master
+    self.names      = names
+    self.parameters = parameters
+
+  def __call__(self):
+    """Read the parameters.
+
+    Returns:
+      Dict with the parameter data (None if not successful) per name.
+    """
+    resp = self.master.read_parameters_packed(self.parameters)
+    return {name: r['data'] if r['status'] == PP_STATUS_OK else None for name, r in zip(self.names, resp)}
+
+
+
+
 class master(object):
   """Implements a propar master for communication with Bronkhorst instruments.
 
@@ -335,6 +1218,13 @@ class master(object):
     comport (str): COM port on which the instrument is connected
     master (obj): Instance of the master class used for communication.
     db (obj): Instance of the propar database, for conversion from DDE number to process, parameter number.
+      By default all masters share one database, which is created on first use.
+    availability (obj): Optional parameter_availability instance. When set, parameters that are known to
+      be unavailable on a device (by device type and firmware) are not requested by read_parameters,
+      these are returned with the recorded status instead. New unavailable parameters are recorded.
+    broadcast_callback (func): Function called with the parameters of received broadcasts.
+    broadcast_listeners (list): Functions called with the node and the (raw) parameters of received broadcasts,
+      used by instruments (for example to refresh the cache).
   """
 
   def __init__(self, comport, baudrate, serial_class=serial.Serial):
@@ -347,8 +1237,8 @@ class master(object):
     # propar message builder
     self.propar_builder = _propar_builder()
 
-    # database
-    self.db = database()
+    # database (shared database when not set, created on first use)
+    self.__db = None
 
     # debug flags
     self.debug_requests = False
@@ -356,6 +1246,8 @@ class master(object):
 
   	# callback for any propar broadcasts that are received
     self.broadcast_callback = self.__dummy_callback
+    # internal listeners for received broadcasts, called with the node and the (raw) parameters
+    self.broadcast_listeners = []
 
     # sequence number
     self.seq = 0
@@ -366,9 +1258,24 @@ class master(object):
     self.__pending_requests   = []
     self.__processed_requests = []
 
+    # compiled fix-ups for received parameters, per requested parameter list and per broadcast layout
+    self.__fixups           = {}
+    self.__broadcast_fixups = {}
+
+    # parameter availability per device identity (disabled when None), and device identity per node
+    self.availability  = None
+    self.__identities  = {}
+    # time (in seconds) before the identity of a node that did not respond is requested again,
+    # and the time of the last failed request per node
+    self.identity_retry      = 5.0
+    self.__identity_failures = {}
+
     # 500 ms timeout on all messages
     self.response_timeout = 0.5
 
+    # polling scheduler, created on first use
+    self.__scheduler = None
+
     # thread for processing propar messages
     self.msg_handler_thread = threading.Thread(target=self.__message_handler_task, args=())
     self.msg_handler_thread.daemon = True
@@ -377,6 +1284,33 @@ class master(object):
   def __dummy_callback(self, dummy):
     pass
 
+  @property
+  def scheduler(self):
+    """Polling scheduler of this master (poll_scheduler), created on first use."""
+    if self.__scheduler is None:
+      self.__scheduler = poll_scheduler(self)
+    return self.__scheduler
+
+  def subscribe(self, node, parameter, period, callback=None, queue=None, change_filter=None):
+    """Periodically read a parameter, see poll_scheduler.subscribe."""
+    return self.scheduler.subscribe(node, parameter, period, callback, queue, change_filter)
+
+  def unsubscribe(self, subscription):
+    """Stop periodically reading a parameter, see poll_scheduler.unsubscribe."""
+    self.scheduler.unsubscribe(subscription)
+
+  @property
+  def db(self):
+    """Propar database, for conversion from DDE number to process, parameter number."""
+    if self.__db is None:
+      return _shared_database()
+    return self.__db
+
+  @db.setter
+  def db(self, value):
+    self.__db = value
+    self.__broadcast_fixups.clear()
+
   def set_baudrate(self, baudrate):
     """Set the baudrate used for communication.
 
@@ -469,13 +1403,10 @@ class master(object):
           device_type = dev_resp[0]['data']
         else:
           # try to get device type from the database
-          db = database()
           # extract device id from id string (first byte)
           device_type = int.from_bytes(bytes(resp[1]['data'][0], encoding='ascii'), byteorder='little')
-          options = db.get_parameter_values(175)
-          for option in options:
-            if device_type == int(option['value']):
-              device_type = option['description'].split(':')[0]
+          for option in self.db.get_parameter_value(175, device_type):
+            device_type = option['description'].split(':')[0]
 
         # Try to get the number of channels from device
         chan_resp = self.read_parameters([{'node': scan_address, 'proc_nr': 0, 'parm_nr': 18, 'parm_type': PP_TYPE_INT8}]) # number of channels
@@ -497,37 +1428,36 @@ class master(object):
               print('Found network loop on node {:}'.format(resp[0]['data']))
 
         found_nodes.append({'address': resp[0]['data'], 'type': device_type, 'serial': serial_number, 'id': resp[1]['data'], 'channels': nr_of_channels})
+        # The device on this node may have been replaced, request its identity again
+        self.__forget_identity(resp[0]['data'])
 
     return found_nodes
 
 
-  def __fix_parameters(self, requested, received):
-    """Fix parameters by adjusting type of received parameters with requested type."""
-    fixed_parameters = []
-    for org_parm, recv_parm in zip(requested, received):
-      try:
-        # fix float
-        if org_parm['parm_type'] == PP_TYPE_FLOAT and recv_parm['parm_type'] == PP_TYPE_INT32:
-          recv_parm['data'] = struct.unpack('f', struct.pack('I', recv_parm['data']))[0]
-          recv_parm['parm_type'] = PP_TYPE_FLOAT
-        # fix sint16
-        elif org_parm['parm_type'] == PP_TYPE_SINT16 and recv_parm['parm_type'] == PP_TYPE_INT16:
-          recv_parm['data'] = struct.unpack('h', struct.pack('H', recv_parm['data']))[0]
-          recv_parm['parm_type'] = PP_TYPE_SINT16
-        # fix bsint16
-        elif org_parm['parm_type'] == PP_TYPE_BSINT16 and recv_parm['parm_type'] == PP_TYPE_INT16:
-          if recv_parm['data'] > 0xA3D6: # 41942
-            recv_parm['data'] = (0xFFFF - recv_parm['data']) * (-1)
-          recv_parm['parm_type'] = PP_TYPE_BSINT16
-        # copy over dde_nr and parm_name when present in org_parm
-        if 'dde_nr' in org_parm.keys():
-          recv_parm['dde_nr'] = org_parm['dde_nr']
-        if 'parm_name' in org_parm.keys():
-          recv_parm['parm_name'] = org_parm['parm_name']
-      except:
-        pass
-      fixed_parameters.append(recv_parm)
-    return fixed_parameters
+  def __get_fixup(self, parameters):
+    """Get the (cached) compiled fix-up for a list of requested parameters."""
+    key = tuple((p['parm_type'], p.get('dde_nr'), p.get('parm_name')) for p in parameters)
+    fixup = self.__fixups.get(key)
+    if fixup is None:
+      if len(self.__fixups) >= 256:
+        self.__fixups.clear()
+      fixup = _parameter_fixup(parameters)
+      self.__fixups[key] = fixup
+    return fixup
+
+
+  def __get_broadcast_fixup(self, layout):
+    """Get the (cached) compiled fix-up for a broadcast layout, a tuple of (proc_nr, parm_nr, parm_type).
+    Parameters that are not in the database are passed as received.
+    """
+    fixup = self.__broadcast_fixups.get(layout)
+    if fixup is None:
+      if len(self.__broadcast_fixups) >= 256:
+        self.__broadcast_fixups.clear()
+      propar_dict = self.db.propar_dict
+      fixup = _parameter_fixup([propar_dict.get((proc_nr, parm_nr), {'parm_type': parm_type}) for proc_nr, parm_nr, parm_type in layout])
+      self.__broadcast_fixups[layout] = fixup
+    return fixup
 
 
   def __message_handler_task(self):
@@ -585,18 +1515,18 @@ class master(object):
 
         # If we dont match, this might be broadcast data
         if request == None:
-          if propar_message['data'][0] == PP_COMMAND_SEND_PARM_BROADCAST and self.broadcast_callback:
+          if propar_message['data'][0] == PP_COMMAND_SEND_PARM_BROADCAST and (self.broadcast_callback or self.broadcast_listeners):
             try:
               # Read parameter objects from broadcast message
               parameters = self.propar_builder.read_pp_send_parameter_message(propar_message)
-			        # Read parameter objects from database (for each parameter in broadcast message)
-              org_parameters = []
-              for recv_parm in parameters:
-                org_parameters.append(self.db.get_propar_parameter(recv_parm['proc_nr'], recv_parm['parm_nr'])[0])
-              # Fix types based on requested types
-              parameters = self.__fix_parameters(org_parameters, parameters)
+              # Pass the received parameters to the listeners (before fixing types)
+              for listener in self.broadcast_listeners:
+                listener(propar_message['node'], parameters)
+              # Fix types based on database types (fix-up per broadcast layout)
+              parameters = self.__get_broadcast_fixup(tuple((p['proc_nr'], p['parm_nr'], p['parm_type']) for p in parameters))(parameters)
               # Call broadcast callback function
-              self.broadcast_callback(parameters)
+              if self.broadcast_callback:
+                self.broadcast_callback(parameters)
             except:
               pass
         # If we matched to a request
@@ -612,10 +1542,10 @@ class master(object):
           # Read data (response to parameter request)
           elif propar_message['data'][0] == PP_COMMAND_SEND_PARM:
             if request['message']['data'][0] == PP_COMMAND_REQUEST_PARM:
-              # read parameter objects from response message
-              parameters = self.propar_builder.read_pp_send_parameter_message(propar_message)
-              # Update data of received parameters with data type and values of requested parameters
-              parameters = self.__fix_parameters(request['parameters'], parameters)
+              # read parameter objects from response message, decoded as the requested types
+              parameters = self.propar_builder.read_pp_send_parameter_message(propar_message, request['fixup'].parm_types)
+              # Update received parameters with the fields of the requested parameters
+              parameters = request['fixup'](parameters)
               # Call callback if present
               if request['callback'] != None:
                 request['callback'](parameters)
@@ -649,6 +1579,27 @@ class master(object):
       return 0
 
 
+  def __request_parameters(self, parameters):
+    """Get the request state for the passed parameters, used to build the propar message.
+    Adds parm_size (from type), proc_index and parm_index (= proc_nr and parm_nr).
+    The passed parameters are not modified (these may be read-only database parameters).
+    """
+    request_parameters = []
+    for parameter in parameters:
+      if 'parm_size' in parameter:
+        parm_size = parameter['parm_size']
+      else:
+        parm_size = self.__get_size(parameter['parm_type'])
+      request_parameters.append({'proc_nr'   : parameter['proc_nr'  ],
+                                 'parm_nr'   : parameter['parm_nr'  ],
+                                 'parm_type' : parameter['parm_type'],
+                                 'parm_size' : parm_size,
+                                 'proc_index': parameter['proc_nr'  ],
+                                 'parm_index': parameter['parm_nr'  ],
+                                 'data'      : parameter.get('data')})
+    return request_parameters
+
+
   def read(self, address, proc_nr, parm_nr, parm_type):
     """Read a single parameter.
 
@@ -701,6 +1652,9 @@ class master(object):
 
     From a list of parameter objects.
 
+    When availability is set, parameters that are unavailable on the device are skipped and returned
+    with the recorded status (and data None), in the position of the requested parameter.
+
     Args:
       parameters (list): List of parameter objects to read.
       callback (func, optional): Function to call when parameters are received (parameters passed in callback).
@@ -709,23 +1663,96 @@ class master(object):
       List with parameters with data if successful, list with one status item otherwise.
       When callback is used this will return None.
     """
-    request_message = {}
-
-    # Add parm_size (from type) and add proc_index and parm_index (= proc_nr and parm_nr)
-    for parameter in parameters:
-      if 'parm_size' not in parameter:
-        parameter['parm_size'] = self.__get_size(parameter['parm_type'])
-      parameter['proc_index'] = parameter['proc_nr']
-      parameter['parm_index'] = parameter['parm_nr']
+    if self.availability is not None:
+      identity = self.__device_identity(parameters[0]['node'])
+      if identity is not None:
+        return self.__read_available_parameters(identity, parameters, callback)
+    return self.__read_parameters(parameters, callback)
 
-    # Fill request message with node address and sequence number
-    request_message['node'] = parameters[0]['node']
-    request_message['seq' ] = self.__next_seq()
+
+  def __device_identity(self, node):
+    """Get the (cached) identity of the device on node, as (device type, firmware version).
+    Returns None when the device does not respond, the identity is not requested again
+    within identity_retry seconds.
+    """
+    identity = self.__identities.get(node)
+    if identity is None:
+      failed = self.__identity_failures.get(node)
+      if failed is not None and time.monotonic() - failed < self.identity_retry:
+        return None
+      identity = []
+      for dde_nr in (90, 105): # device type, firmware version
+        resp = self.__read_parameters([dict(self.db.get_parameter(dde_nr, copy=False), node=node)])[0]
+        if resp['status'] == PP_STATUS_TIMEOUT_ANSWER:
+          self.__identity_failures[node] = time.monotonic()
+          return None
+        identity.append(resp['data'] if resp['status'] == PP_STATUS_OK else '')
+      identity = tuple(identity)
+      self.__identities[node] = identity
+      self.__identity_failures.pop(node, None)
+    return identity
+
+
+  def __forget_identity(self, node):
+    """Forget the (cached) identity of the device on node, it is requested again on the next read."""
+    self.__identities.pop(node, None)
+    self.__identity_failures.pop(node, None)
+
+
+  def __read_available_parameters(self, identity, parameters, callback):
+    """Read the parameters that are available on the device, and record newly found unavailable parameters."""
+    statuses  = [self.availability.get_status(identity, p['proc_nr'], p['parm_nr']) for p in parameters]
+    available = [p for p, status in zip(parameters, statuses) if status is None]
+    # The node address is taken from the first parameter, which may be skipped
+    if available and 'node' not in available[0]:
+      available[0] = dict(available[0], node=parameters[0]['node'])
+
+    def merge(response):
+      failed = len(available) > 0 and response[0]['status'] != PP_STATUS_OK
+      # The device stopped responding (and may be replaced), request its identity again
+      if failed and response[0]['status'] == PP_STATUS_TIMEOUT_ANSWER:
+        self.__forget_identity(parameters[0]['node'])
+      # Record the parameter of a failed single parameter request
+      if failed and len(available) == 1 and response[0]['status'] in parameter_availability.UNAVAILABLE:
+        self.availability.record(identity, available[0]['proc_nr'], available[0]['parm_nr'], response[0]['status'])
+        response = [dict(available[0], status=response[0]['status'], data=None)]
+        failed   = False
+      if failed or len(available) == len(parameters):
+        return response
+      # Insert skipped parameters (with their status) at the requested positions
+      received = iter(response)
+      return [next(received) if status is None else dict(p, status=status, data=None) for p, status in zip(parameters, statuses)]
+
+    if not available:
+      response = merge([])
+    elif callback is not None:
+      return self.__read_parameters(available, lambda response: callback(merge(response)))
+    else:
+      response = self.__read_parameters(available)
+      # A chained request failed on an unavailable parameter, find (and record) it with single requests
+      if len(available) > 1 and response[0]['status'] in parameter_availability.UNAVAILABLE:
+        probed = [self.__read_available_parameters(identity, [dict(p, node=parameters[0]['node'])], None)[0]['status'] for p in available]
+        if any(status in parameter_availability.UNAVAILABLE for status in probed):
+          return self.__read_available_parameters(identity, parameters, None)
+      response = merge(response)
+    if callback is not None:
+      callback(response)
+      return None
+    return response
+
+
+  def __read_parameters(self, parameters, callback=None):
+    """Read multiple parameters (see read_parameters), without checking availability."""
+    request_message = {}
+
+    # Fill request message with node address and sequence number
+    request_message['node'] = parameters[0]['node']
+    request_message['seq' ] = self.__next_seq()
 
     # Build the request message (will update length and data fields)
-    request_message = self.propar_builder.build_pp_request_parameter_message(request_message, parameters)
+    request_message = self.propar_builder.build_pp_request_parameter_message(request_message, self.__request_parameters(parameters))
     # Add this message to the pending requests list
-    request = {'message': request_message, 'parameters': parameters, 'age': time.time(), 'callback': callback}
+    request = {'message': request_message, 'parameters': parameters, 'fixup': self.__get_fixup(parameters), 'age': time.time(), 'callback': callback}
     self.__pending_requests.append(request)
 
     # Write the message to the propar interface
@@ -775,17 +1802,10 @@ class master(object):
     """
     write_message = {}
 
-    # Add parm_size (from type) and add proc_index and parm_index (= proc_nr and parm_nr)
-    for parameter in parameters:
-      if 'parm_size' not in parameter:
-        parameter['parm_size'] = self.__get_size(parameter['parm_type'])
-      parameter['proc_index'] = parameter['proc_nr']
-      parameter['parm_index'] = parameter['parm_nr']
-
     # Setup the final fields, and build the message.
     write_message['node'] = parameters[0]['node']
     write_message['seq' ] = self.__next_seq()
-    write_message = self.propar_builder.build_pp_send_parameter_message(write_message, parameters, command)
+    write_message = self.propar_builder.build_pp_send_parameter_message(write_message, self.__request_parameters(parameters), command)
 
     if command == PP_COMMAND_SEND_PARM_WITH_ACK:
       request = {'message': write_message, 'parameters': parameters, 'age': time.time(), 'callback': callback}
@@ -818,24 +1838,883 @@ class master(object):
       return PP_STATUS_OK
 
 
+  @staticmethod
+  def __pack(parameters, read):
+    """Pack parameters (in order) into batches that fit in a single propar message.
+    For reads both the request and the (expected) reply must fit, for writes the send message.
+
+    Returns:
+      List of batches, each a list of indexes into parameters.
+    """
+    batches      = []
+    batch        = []
+    request_len  = 0
+    send_len     = 0
+    prev_proc_nr = None
+    for i, parameter in enumerate(parameters):
+      chained = len(batch) > 0 and parameter['proc_nr'] == prev_proc_nr
+      # size of the value in a send parameter message
+      codec = _PP_CODECS.get(parameter['parm_type'])
+      if codec is not None:
+        size = codec.size
+      elif read or parameter.get('data') is None:
+        size = 1 + (parameter.get('parm_size') or _PP_STRING_SIZE_ESTIMATE)
+      else:
+        # length byte, string (padded to parm_size, or zero terminated when parm_size is 0)
+        data = parameter['data']
+        data = data.encode('utf-8') if isinstance(data, str) else data if isinstance(data, bytes) else str(data).encode('utf-8')
+        size = 1 + max(len(data), parameter.get('parm_size') or 0) + (0 if parameter.get('parm_size') else 1)
+      parm_request_len = (3 if chained else 4) + (1 if codec is None else 0)
+      parm_send_len    = (1 if chained else 2) + size
+      if batch and (1 + send_len + parm_send_len > _PP_MAX_MESSAGE_LEN or (read and 1 + request_len + parm_request_len > _PP_MAX_MESSAGE_LEN)):
+        batches.append(batch)
+        batch       = []
+        request_len = 0
+        send_len    = 0
+        parm_request_len = 4 + (1 if codec is None else 0)
+        parm_send_len    = 2 + size
+      batch.append(i)
+      request_len += parm_request_len
+      send_len    += parm_send_len
+      prev_proc_nr = parameter['proc_nr']
+    if batch:
+      batches.append(batch)
+    return batches
+
+
+  def __send_batches(self, parameters, batches, send):
+    """Send the batches pipelined with send(batch parameters, callback), and wait for all responses.
+
+    Returns:
+      List with the response per batch, None when no response was received in time.
+    """
+    node      = parameters[0]['node']
+    responses = [None] * len(batches)
+    received  = []
+    for n, batch in enumerate(batches):
+      batch_parameters    = [parameters[i] for i in batch]
+      batch_parameters[0] = dict(batch_parameters[0], node=node)
+      done = threading.Event()
+      def callback(response, n=n, done=done):
+        responses[n] = response
+        done.set()
+      received.append(done)
+      send(batch_parameters, callback)
+      # ascii mode can not match pipelined replies (no sequence numbers), wait for each reply
+      if self.propar.mode != PP_MODE_BINARY:
+        done.wait(self.response_timeout)
+    deadline = time.time() + self.response_timeout
+    for done in received:
+      done.wait(max(0, deadline - time.time()))
+    return responses
+
+
+  def write_group(self, writes, command=PP_COMMAND_SEND_PARM_WITH_ACK, broadcast_node=None):
+    """Write parameters to multiple nodes at (nearly) the same moment.
+
+    When broadcast_node is set and all nodes are written with the same parameters and data, a single
+    broadcast message (PP_COMMAND_SEND_PARM_BROADCAST, not acknowledged) is sent to broadcast_node.
+    Otherwise the messages for all nodes are built first, and sent back-to-back in a single write
+    to the serial port (pipelined), after which the acknowledges are collected.
+
+    Args:
+      writes (dict): List of parameter objects, with data, per node address.
+      command (int, optional): Propar command to use for writing (when not broadcast).
+      broadcast_node (int, optional): Node address to send a broadcast message to (broadcast is not used when None).
+
+    Returns:
+      Dict with 'broadcast' (True when broadcast was used), 'status' (propar status code per node, PP_STATUS_OK
+      when not acknowledged), 'tx_time' (seconds to send all messages) and 'ack_spread' (seconds between the
+      first and last acknowledge, None when not acknowledged).
+    """
+    report = {'broadcast': False, 'status': {}, 'tx_time': 0.0, 'ack_spread': None}
+    layouts = {node: [(p['proc_nr'], p['parm_nr'], p['parm_type'], p['data']) for p in parameters] for node, parameters in writes.items()}
+    if broadcast_node is not None and len(set(map(tuple, layouts.values()))) == 1:
+      parameters = list(writes.values())[0]
+      message = self.propar_builder.build_pp_send_parameter_message({'node': broadcast_node, 'seq': self.__next_seq()},
+                                                                     self.__request_parameters(parameters), PP_COMMAND_SEND_PARM_BROADCAST)
+      begin = time.time()
+      self.propar.write_propar_message(message)
+      report['tx_time'  ] = time.time() - begin
+      report['broadcast'] = True
+      report['status'   ] = dict.fromkeys(writes, PP_STATUS_OK)
+      return report
+
+    # Build all messages (and pending requests) before sending
+    messages = []
+    acks     = {}
+    received = []
+    for node, parameters in writes.items():
+      for batch in self.__pack(parameters, read=False):
+        message = self.propar_builder.build_pp_send_parameter_message({'node': node, 'seq': self.__next_seq()},
+                                                                       self.__request_parameters([parameters[i] for i in batch]), command)
+        messages.append(message)
+        if command == PP_COMMAND_SEND_PARM_WITH_ACK:
+          done = threading.Event()
+          def callback(status, node=node, done=done):
+            acks.setdefault(node, []).append((time.time(), status))
+            done.set()
+          received.append(done)
+          self.__pending_requests.append({'message': message, 'parameters': parameters, 'age': time.time(), 'callback': callback})
+
+    if not messages:
+      return report
+    begin = time.time()
+    if self.propar.mode == PP_MODE_BINARY:
+      self.propar.write_propar_messages(messages)
+    else:
+      for message, done in itertools.zip_longest(messages, received):
+        self.propar.write_propar_message(message)
+        if done is not None:
+          done.wait(self.response_timeout)
+    report['tx_time'] = time.time() - begin
+
+    if command != PP_COMMAND_SEND_PARM_WITH_ACK:
+      report['status'] = dict.fromkeys(writes, PP_STATUS_OK)
+      return report
+    deadline = begin + self.response_timeout
+    for done in received:
+      done.wait(max(0, deadline - time.time()))
+    for node in writes:
+      statuses = [status for ack_time, status in acks.get(node, [])]
+      failed   = [status for status in statuses if status != PP_STATUS_OK]
+      if len(statuses) < len(self.__pack(writes[node], read=False)):
+        report['status'][node] = PP_STATUS_TIMEOUT_ANSWER
+      else:
+        report['status'][node] = failed[0] if failed else PP_STATUS_OK
+    ack_times = [ack_time for node_acks in acks.values() for ack_time, status in node_acks]
+    if ack_times:
+      report['ack_spread'] = max(ack_times) - min(ack_times)
+    return report
+
+
+  def read_parameters_packed(self, parameters):
+    """Read any number of parameters of a single node, packed into the minimum number of (chained) messages.
+    The messages are sent pipelined. When a message fails (other than by timeout), its parameters are read
+    one by one, so a single failing parameter does not fail the others.
+
+    Args:
+      parameters (list): List of parameter objects to read (node of the first parameter is used).
+
+    Returns:
+      List with one parameter (with status and data) per requested parameter, in the requested order.
+    """
+    if not parameters:
+      return []
+    # Order by process, to chain as many parameters as possible
+    order      = sorted(range(len(parameters)), key=lambda i: parameters[i]['proc_nr'])
+    ordered    = [dict(parameters[i]) for i in order]
+    ordered[0]['node'] = parameters[0]['node']
+    batches    = self.__pack(ordered, read=True)
+    responses  = self.__send_batches(ordered, batches, self.read_parameters)
+
+    results = [None] * len(parameters)
+    for batch, response in zip(batches, responses):
+      if response is None:
+        response = [{'status': PP_STATUS_TIMEOUT_ANSWER, 'data': None}]
+      if len(response) != len(batch) and response[0]['status'] != PP_STATUS_TIMEOUT_ANSWER:
+        # Failed, fall back to single requests
+        response = [self.read_parameters([dict(ordered[i], node=parameters[0]['node'])])[0] for i in batch]
+      for i, resp in zip(batch, response if len(response) == len(batch) else [response[0]] * len(batch)):
+        results[order[i]] = resp
+    return results
+
+
+  def write_parameters_packed(self, parameters, command=PP_COMMAND_SEND_PARM_WITH_ACK, fallback=False):
+    """Write any number of parameters of a single node, packed into the minimum number of (chained) messages.
+    Parameters are written in the given order. The messages are sent pipelined.
+
+    Args:
+      parameters (list): List of parameter objects, with data (node of the first parameter is used).
+      command (int, optional): Propar command to use for writing.
+      fallback (bool, optional): When a message fails (other than by timeout), write its parameters one by one,
+        so a single failing parameter does not prevent writing the others.
+
+    Returns:
+      Propar status code (0 if successful, otherwise the status of the first failed message).
+    """
+    if not parameters:
+      return PP_STATUS_OK
+    batches = self.__pack(parameters, read=False)
+    if command != PP_COMMAND_SEND_PARM_WITH_ACK:
+      for batch in batches:
+        batch_parameters    = [parameters[i] for i in batch]
+        batch_parameters[0] = dict(batch_parameters[0], node=parameters[0]['node'])
+        self.write_parameters(batch_parameters, command)
+      return PP_STATUS_OK
+    responses = self.__send_batches(parameters, batches, lambda batch_parameters, callback: self.write_parameters(batch_parameters, command, callback))
+    if fallback:
+      for n, (batch, response) in enumerate(zip(batches, responses)):
+        if response is not None and response != PP_STATUS_OK and len(batch) > 1:
+          statuses     = [self.write_parameters([dict(parameters[i], node=parameters[0]['node'])], command) for i in batch]
+          responses[n] = next((status for status in statuses if status != PP_STATUS_OK), PP_STATUS_OK)
+    for response in responses:
+      if response is None:
+        return PP_STATUS_TIMEOUT_ANSWER
+      if response != PP_STATUS_OK:
+        return response
+    return PP_STATUS_OK
+
+
+
+
+class poll_subscription(object):
+  """Subscription of the poll_scheduler, a parameter that is read periodically (or a timed job).
+
+  Attributes:
+    node (int): Node address (None for jobs).
+    parameter (dict): Parameter object to read (None for jobs).
+    period (float): Requested period in seconds.
+    callback (func): Function called with (subscription, result), or without arguments for jobs.
+    queue (obj): Queue to put (subscription, result) in, for example a queue.Queue.
+    change_filter (obj): Optional change_filter, results are only passed on when the value changed.
+    result (dict): Last result (parameter with status and data).
+    reads (int): Number of completed reads (or job calls).
+    failures (int): Number of reads that were not successful.
+    overruns (int): Number of times the subscription was more than a period late.
+    notifications (int): Number of results passed to the callback and/or queue.
+    errors (int): Number of exceptions raised by the read, callback or job.
+    last_error (Exception): Last exception raised by the read, callback or job, or None.
+  """
+  def __init__(self, node, parameter, period, callback=None, queue=None, change_filter=None):
+    self.node          = node
+    self.parameter     = parameter
+    self.period        = period
+    self.callback      = callback
+    self.queue         = queue
+    self.change_filter = change_filter
+    self.result        = None
+    self.reads         = 0
+    self.failures      = 0
+    self.overruns      = 0
+    self.notifications = 0
+    self.errors        = 0
+    self.last_error    = None
+    self.started   = None
+    self.next_due  = None
+
+  def requested_rate(self):
+    """Requested rate (reads per second)."""
+    return 1.0 / self.period
+
+  def achieved_rate(self):
+    """Achieved rate (reads per second) since the subscription started."""
+    if self.started is None:
+      return 0.0
+    # the first read is at the start, so n reads take (n - 1) periods
+    elapsed = time.monotonic() - self.started + self.period
+    return self.reads / elapsed if elapsed > 0 else 0.0
+
+
+
+
+class change_filter(object):
+  """Filter for subscriptions, to only pass on values that changed significantly (see poll_scheduler.subscribe).
+
+  Values are compared with the last value that was passed on. Without deadband and percent any change
+  is significant (for example for alarm and status words). Changes within min_interval after the last
+  passed on value are held back, the latest value is passed on when the interval has passed (when it is
+  still significant), so bursts of changes result in a single notification.
+
+  Args:
+    deadband (float, optional): Minimum absolute change.
+    percent (float, optional): Minimum change in percent of the last passed on value.
+    min_interval (float, optional): Minimum time between passed on values in seconds.
+  """
+  def __init__(self, deadband=None, percent=None, min_interval=0.0):
+    self.deadband     = deadband
+    self.percent      = percent
+    self.min_interval = min_interval
+    self.value        = None
+    self.time         = None
+
+  def significant(self, value):
+    """Check if value changed significantly compared to the last passed on value."""
+    if self.time is None:
+      return True
+    if not isinstance(value, numbers.Real) or not isinstance(self.value, numbers.Real) or (self.deadband is None and self.percent is None):
+      return value != self.value
+    change = abs(value - self.value)
+    if self.deadband is not None and change > self.deadband:
+      return True
+    if self.percent is not None and change > abs(self.value) * self.percent / 100.0:
+      return True
+    return False
+
+  def changed(self, value):
+    """Check if value should be passed on, and if so remember it as the last passed on value."""
+    now = time.monotonic()
+    if not self.significant(value):
+      return False
+    if self.time is not None and now - self.time < self.min_interval:
+      return False
+    self.value = value
+    self.time  = now
+    return True
+
+
+
+
+class poll_scheduler(object):
+  """Scheduler that periodically reads parameters, each with its own period.
+
+  On each tick all due parameters are read, packed per node into as few chained messages as possible
+  (see master.read_parameters_packed). Subscriptions with the same node and period are due at the same
+  time (so these share messages), other groups are spread over their period to avoid bursts.
+  Results are passed to the callback and/or queue of each subscription.
+
+  The scheduler can also run timed jobs (functions called periodically on the scheduler thread).
+  Exceptions raised by reads, callbacks and jobs are counted per subscription (errors and last_error),
+  and do not stop the scheduler. The scheduler thread is started on the first subscription, and can be
+  stopped with stop.
+
+  Args:
+    master (obj): Master used for communication.
+    tick (float, optional): Maximum time between checks for due subscriptions, in seconds.
+  """
+
+  # Golden ratio, used to spread the phases of subscription groups over their period
+  PHASE_STEP = 0.6180339887498949
+
+  def __init__(self, master, tick=0.01):
+    self.master        = master
+    self.tick          = tick
+    self.subscriptions = []
+    self.phases        = {}
+    self.busy          = 0.0
+    self.started       = time.monotonic()
+    self.condition     = threading.Condition()
+    self.thread        = None
+    self.stopping      = False
+
+  def subscribe(self, node, parameter, period, callback=None, queue=None, change_filter=None):
+    """Periodically read a parameter.
+
+    Args:
+      node (int): Node address.
+      parameter (dict or int): Parameter object, or DDE nr.
+      period (float): Period in seconds.
+      callback (func, optional): Function called with (subscription, result) after each read.
+      queue (obj, optional): Queue to put (subscription, result) in after each read.
+      change_filter (obj, optional): change_filter, to only pass on results when the value changed.
+
+    Returns:
+      The poll_subscription.
+    """
+    if isinstance(parameter, numbers.Integral):
+      parameter = self.master.db.get_parameter(parameter, copy=False)
+    return self.__add(poll_subscription(node, parameter, period, callback, queue, change_filter), (node, period))
+
+  def add_job(self, period, function):
+    """Periodically call a function on the scheduler thread.
+
+    Args:
+      period (float): Period in seconds.
+      function (func): Function to call (without arguments).
+
+    Returns:
+      The poll_subscription of the job.
+    """
+    return self.__add(poll_subscription(None, None, period, function), None)
+
+  def unsubscribe(self, subscription):
+    """Remove a subscription (or job)."""
+    with self.condition:
+      if subscription in self.subscriptions:
+        self.subscriptions.remove(subscription)
+
+  def stop(self):
+    """Stop the scheduler thread (waits for the current reads and jobs to finish).
+    Subscriptions are kept, the thread is started again on the next subscription.
+    """
+    with self.condition:
+      thread        = self.thread
+      self.stopping = True
+      self.condition.notify()
+    if thread is not None and thread is not threading.current_thread():
+      thread.join()
+
+  def __add(self, subscription, group):
+    """Schedule a new subscription, in phase with its group (None for no group)."""
+    if not subscription.period > 0:
+      raise ValueError('Period must be greater than zero!')
+    with self.condition:
+      now = time.monotonic()
+      if group is None or group not in self.phases:
+        phase = (len(self.phases) * self.PHASE_STEP) % 1.0
+        if group is not None:
+          self.phases[group] = (now, phase)
+        start = now + phase * subscription.period
+      else:
+        # Due in phase with the other subscriptions of the group
+        group_start, phase = self.phases[group]
+        start = group_start + phase * subscription.period
+        start += max(0, math.ceil((now - start) / subscription.period)) * subscription.period
+      subscription.next_due = start
+      subscription.started  = start
+      self.subscriptions.append(subscription)
+      if self.thread is None or self.stopping:
+        self.stopping = False
+        self.thread = threading.Thread(target=self.__scheduler_task, args=())
+        self.thread.daemon = True
+        self.thread.start()
+      self.condition.notify()
+    return subscription
+
+  def statistics(self):
+    """Get statistics of the subscriptions, to check if the requested rates are achieved.
+
+    Returns:
+      Dict with the 'utilization' of the scheduler (fraction of time spent reading and in jobs),
+      and a list of 'subscriptions' with node, parm_name, period, requested_rate, achieved_rate,
+      reads, failures, overruns, notifications and errors per subscription.
+    """
+    with self.condition:
+      subscriptions = list(self.subscriptions)
+    elapsed = time.monotonic() - self.started
+    return {'utilization'  : self.busy / elapsed if elapsed > 0 else 0.0,
+            'subscriptions': [{'node'          : sub.node,
+                               'parm_name'     : sub.parameter.get('parm_name') if sub.parameter is not None else None,
+                               'period'        : sub.period,
+                               'requested_rate': sub.requested_rate(),
+                               'achieved_rate' : sub.achieved_rate(),
+                               'reads'         : sub.reads,
+                               'failures'      : sub.failures,
+                               'overruns'      : sub.overruns,
+                               'notifications' : sub.notifications,
+                               'errors'        : sub.errors} for sub in subscriptions]}
+
+  def __scheduler_task(self):
+    """Read due subscriptions (packed per node) and run due jobs."""
+    while True:
+      with self.condition:
+        if self.stopping or self.thread is not threading.current_thread():
+          if self.thread is threading.current_thread():
+            self.thread = None
+          return
+        now = time.monotonic()
+        due = [sub for sub in self.subscriptions if sub.next_due <= now]
+        if not due:
+          next_due = min([sub.next_due for sub in self.subscriptions], default=now + self.tick)
+          self.condition.wait(min(self.tick, max(0, next_due - now)))
+          continue
+        # Schedule the next reads, skip periods when more than a period late
+        for sub in due:
+          sub.next_due += sub.period
+          if sub.next_due <= now:
+            sub.overruns += 1
+            sub.next_due  = now + sub.period
+
+      begin = time.monotonic()
+      nodes = {}
+      for sub in due:
+        if sub.parameter is None:
+          self.__run_job(sub)
+        else:
+          nodes.setdefault(sub.node, []).append(sub)
+      for node, subs in nodes.items():
+        parameters    = [sub.parameter for sub in subs]
+        parameters[0] = dict(parameters[0], node=node)
+        try:
+          results = self.master.read_parameters_packed(parameters)
+        except Exception:
+          # Read one by one, so a single failing subscription does not fail the others
+          results = [self.__read(sub) for sub in subs]
+        for sub, result in zip(subs, results):
+          if result is not None:
+            self.__deliver(sub, result)
+      self.busy += time.monotonic() - begin
+
+  def __read(self, sub):
+    """Read the parameter of a single subscription, returns None (and counts the error) on exceptions."""
+    try:
+      return self.master.read_parameters_packed([dict(sub.parameter, node=sub.node)])[0]
+    except Exception as error:
+      sub.failures += 1
+      self.__error(sub, error)
+      return None
+
+  def __error(self, sub, error):
+    """Count (and in debug mode print) an exception of a subscription."""
+    sub.errors    += 1
+    sub.last_error = error
+    if self.master.debug:
+      print("Scheduler error (node {:}, {:}): {!r}".format(sub.node, sub.parameter.get('parm_name') if sub.parameter is not None else sub.callback, error))
+
+  def __run_job(self, sub):
+    """Run a timed job."""
+    sub.reads += 1
+    try:
+      sub.callback()
+    except Exception as error:
+      sub.failures += 1
+      self.__error(sub, error)
+
+  def __deliver(self, sub, result):
+    """Pass the result of a read to the callback and/or queue of the subscription."""
+    sub.reads += 1
+    if result['status'] != PP_STATUS_OK:
+      sub.failures += 1
+    sub.result = result
+    if sub.change_filter is not None and (result['status'] != PP_STATUS_OK or not sub.change_filter.changed(result['data'])):
+      return
+    sub.notifications += 1
+    if sub.queue is not None:
+      sub.queue.put((sub, result))
+    if sub.callback is not None:
+      try:
+        sub.callback(sub, result)
+      except Exception as error:
+        self.__error(sub, error)
+
+
+
+
+class parameter_availability(object):
+  """Map of parameters that are not available on a type of device, learned from the replies of devices.
+
+  Devices are identified by device type and firmware version, so the map applies to all devices
+  with the same identity. Parameters that replied with one of the UNAVAILABLE statuses are recorded
+  (by process and parameter number). The map is persisted to a JSON file when path is given.
+
+  Args:
+    path (str, optional): JSON file to load the map from, and save the map to when it changes.
+  """
+
+  # Statuses that indicate the parameter is not available on the device
+  UNAVAILABLE = (PP_STATUS_PROC_NUMBER, PP_STATUS_PARM_NUMBER, PP_STATUS_PARM_TYPE)
+
+  # Version of the file format
+  VERSION = 1
+
+  def __init__(self, path=None):
+    self.path    = path
+    self.devices = {}
+    self.lock    = threading.Lock()
+    if path is not None and os.path.exists(path):
+      self.load()
+
+  @staticmethod
+  def __key(identity):
+    """Get the key of a device identity (device type, firmware version)."""
+    return '/'.join(str(field).strip() for field in identity)
+
+  def get_status(self, identity, proc_nr, parm_nr):
+    """Get the recorded status of an unavailable parameter.
+
+    Args:
+      identity (tuple): Device identity (device type, firmware version).
+      proc_nr (int): Process number.
+      parm_nr (int): Parameter number.
+
+    Returns:
+      The recorded status, or None when the parameter is not known to be unavailable.
+    """
+    device = self.devices.get(self.__key(identity))
+    if device is None:
+      return None
+    return device.get((proc_nr, parm_nr))
+
+  def record(self, identity, proc_nr, parm_nr, status):
+    """Record an unavailable parameter, and save the map when path is set.
+
+    Args:
+      identity (tuple): Device identity (device type, firmware version).
+      proc_nr (int): Process number.
+      parm_nr (int): Parameter number.
+      status (int): Status the device replied with.
+    """
+    with self.lock:
+      device = self.devices.setdefault(self.__key(identity), {})
+      if device.get((proc_nr, parm_nr)) == status:
+        return
+      device[(proc_nr, parm_nr)] = status
+      if self.path is not None:
+        self.save()
+
+  def forget(self, identity=None):
+    """Forget the unavailable parameters of a device identity (or all devices when None)."""
+    with self.lock:
+      if identity is None:
+        self.devices.clear()
+      else:
+        self.devices.pop(self.__key(identity), None)
+      if self.path is not None:
+        self.save()
+
+  def load(self):
+    """Load the map from path."""
+    with open(self.path, 'r', encoding='utf-8') as f:
+      data = json.load(f)
+    if data.get('version') != self.VERSION:
+      raise ValueError('Unsupported parameter availability file version: {}'.format(data.get('version')))
+    self.devices = {key: {(proc_nr, parm_nr): status for proc_nr, parm_nr, status in parms} for key, parms in data['devices'].items()}
+
+  def save(self):
+    """Save the map to path (replaced atomically)."""
+    data = {'version': self.VERSION,
+            'devices': {key: sorted([proc_nr, parm_nr, status] for (proc_nr, parm_nr), status in parms.items()) for key, parms in self.devices.items()}}
+    temp_path = '{}.{}'.format(self.path, os.getpid())
+    with open(temp_path, 'w', encoding='utf-8') as f:
+      json.dump(data, f, indent=1)
+    os.replace(temp_path, self.path)
+
+
+
+
+class parameter_snapshot(object):
+  """Snapshot of the parameter data of an instrument, see instrument.snapshot and instrument.restore.
+
+  A snapshot contains all parameters that were read, only the configuration parameters in RESTORE
+  are restored. These are restored in stages, each stage after the parameters it depends on:
+  the fluidset first (selects the fluid and its calibration), then the units (the capacity unit
+  changes the unit of the other settings), then the other settings (alarms, counter, controller,
+  user tag), and the control mode last (so the instrument only changes the source of its setpoint
+  when all settings are restored). Measured values, identity, addresses, calibration and setpoints
+  are never restored.
+
+  In the file, bytes (for example alarm registers) are stored as {"hex": "..."}.
+
+  Args:
+    parameters (dict): Parameter data per DDE nr.
+    channel (int, optional): Channel the snapshot was read from.
+
+  Attributes:
+    parameters (dict): Parameter data per DDE nr.
+    channel (int): Channel the snapshot was read from.
+    time (float): Time the snapshot was taken (seconds since the epoch).
+  """
+
+  # Version of the file format
+  VERSION = 1
+
+  # Restored parameters (DDE nrs), in stages
+  RESTORE = ((24,),                                          # fluidset index
+             (129, 123, 128),                                # capacity unit, counter unit index, counter unit
+             (10, 115, 116, 117, 118, 119, 120, 121, 182,    # setpoint slope, user tag, alarm settings
+              124, 125, 126, 127, 130, 156, 157,             # counter settings, reset enables
+              72, 141, 165, 167, 168, 169, 254, 361,         # controller responses, PID, speed, hysteresis
+              301, 329, 339),                                # valve safe state, setpoint monitor mode, setpoint minimum
+             (12,))                                          # control mode
+
+  def __init__(self, parameters, channel=None):
+    self.parameters = parameters
+    self.channel    = channel
+    self.time       = time.time()
+
+  @classmethod
+  def load(cls, path):
+    """Load a snapshot from a JSON file."""
+    with open(path, 'r', encoding='utf-8') as f:
+      data = json.load(f)
+    if data.get('version') != cls.VERSION:
+      raise ValueError('Unsupported parameter snapshot file version: {}'.format(data.get('version')))
+    parameters    = {int(dde_nr): bytes.fromhex(value['hex']) if isinstance(value, dict) else value for dde_nr, value in data['parameters'].items()}
+    snapshot      = cls(parameters, data.get('channel'))
+    snapshot.time = data.get('time')
+    return snapshot
+
+  def save(self, path):
+    """Save the snapshot to a JSON file (replaced atomically)."""
+    data = {'version'   : self.VERSION,
+            'time'      : self.time,
+            'channel'   : self.channel,
+            'parameters': {str(dde_nr): {'hex': value.hex()} if isinstance(value, (bytes, bytearray)) else value
+                           for dde_nr, value in sorted(self.parameters.items())}}
+    temp_path = '{}.{}'.format(path, os.getpid())
+    try:
+      with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+      os.replace(temp_path, path)
+    finally:
+      if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+
+
+class _parameter_fixup(object):
+  """Compiled fix-up for the parameters received in reply to a list of requested parameters.
+
+  Holds the requested types (to decode the reply with) and one converter per requested parameter,
+  which reinterprets the wire type as the requested type (when not already decoded as such)
+  and copies over dde_nr and parm_name. Calling the fix-up applies the converters to the received parameters.
+
+  Args:
+    requested (list): List of requested parameter objects.
+  """
+
+  def __init__(self, requested):
+    self.parm_types = [parm['parm_type'] for parm in requested]
+    self.converters = [self.__converter(parm) for parm in requested]
+
+  @staticmethod
+  def __converter(parm):
+    """Create the converter for a single requested parameter."""
+    fields = {key: parm[key] for key in ('dde_nr', 'parm_name') if key in parm}
+    codec  = _PP_CODECS.get(parm['parm_type'])
+    if codec is None or codec.parm_type == codec.wire_type:
+      def convert(recv_parm):
+        recv_parm.update(fields)
+        return recv_parm
+    else:
+      wire_type = codec.wire_type
+      parm_type = codec.parm_type
+      from_wire = codec.from_wire
+      def convert(recv_parm):
+        if recv_parm['parm_type'] == wire_type and recv_parm['data'] is not None:
+          recv_parm['data'     ] = from_wire(recv_parm['data'])
+          recv_parm['parm_type'] = parm_type
+        recv_parm.update(fields)
+        return recv_parm
+    return convert
+
+  def __call__(self, received):
+    return [convert(recv_parm) for convert, recv_parm in zip(self.converters, received)]
+
+
+
+
+class value_decoder(object):
+  """Decoder of raw parameter values to the descriptions of the parameter values.
+
+  Compiled from the value objects of a parameter. Value objects with a filter (bit mask,
+  for example '&H01' or '&H1C0000') describe a field of a status or alarm word, value
+  objects without filter describe the complete value (enumeration).
+
+  Args:
+    values (list): Value objects of a single parameter.
+
+  Attributes:
+    fields (tuple): Fields as (mask, shift, {field value: description}), in order of mask.
+      The mask is None for enumerations (complete value).
+  """
+  def __init__(self, values):
+    fields = {}
+    for row in values:
+      mask = int(row['filter'][2:], 16) if row['filter'] else None
+      fields.setdefault(mask, {}).setdefault(int(row['value']), row['description'])
+    self.fields = tuple((mask, self.__shift(mask), labels) for mask, labels in sorted(fields.items(), key=lambda field: -1 if field[0] is None else field[0]))
+
+  @staticmethod
+  def __shift(mask):
+    """Get the position of the lowest bit of mask."""
+    if mask is None:
+      return 0
+    return (mask & -mask).bit_length() - 1
+
+  def decode(self, raw):
+    """Decode a raw parameter value.
+
+    Args:
+      raw (int): Raw parameter value.
+
+    Returns:
+      A list with the description of each field, fields with an unknown value are skipped.
+    """
+    raw    = int(raw)
+    result = []
+    for mask, shift, labels in self.fields:
+      value = raw if mask is None else (raw & mask) >> shift
+      if value in labels:
+        result.append(labels[value])
+    return result
+
+  def decode_array(self, raw):
+    """Decode an array of raw parameter values (for example historical values), using NumPy.
+
+    Args:
+      raw (array_like): Raw parameter values (integers).
+
+    Returns:
+      A list with a NumPy (object) array of descriptions per field (see fields), None for unknown values.
+    """
+    try:
+      import numpy as np
+    except ImportError:
+      raise ImportError('decode_array requires numpy (pip install bronkhorst-propar[numpy])')
+
+    raw    = np.asarray(raw, dtype=np.int64)
+    result = []
+    for mask, shift, labels in self.fields:
+      value  = raw if mask is None else (raw & mask) >> shift
+      known  = np.array(sorted(labels), dtype=np.int64)
+      table  = np.array([labels[v] for v in known] + [None], dtype=object)
+      index  = np.minimum(np.searchsorted(known, value), len(known) - 1)
+      index  = np.where(known[index] == value, index, len(known))
+      result.append(table[index])
+    return result
+
+
 
 
 class database(object):
   """The database class is used to convert FlowDDE numbers to propar parameter objects.
 
     Several other supporting functions are also provided for manual use.
+
+    The indexes by name (and search index) and the indexes of the parameter values
+    are built on first use, so these do not slow down loading the database.
+
+    External parameter databases (JSON or CSV) can be loaded with database_path,
+    for example to add parameters of newer firmware. These are merged onto the
+    bundled parameters: parameters (and values) with the same DDE nr replace the
+    bundled ones.
+
+    CSV files use the FlowDDE columns (tab, comma or semicolon separated)::
+
+      Parameter  LongName  Name  Process  FBnr  VarType  VarLength  Read  Write  ...
+
+    VarType is a FlowDDE type (c, i, l, f, s) or a type name of the bundled
+    database (Byte, UInt16, BHTInteger, UInt32, Float, String, BinaryString).
+    A CSV file with the columns description, filter, id, name, parameter and value
+    contains parameter values. JSON files contain a list of parameters, or an object
+    with "parameters" and "values" lists. Parameters use either the FlowDDE columns,
+    or the format of the bundled database (parameters.py).
+
+  Args:
+    database_path (str or list:str, optional): External parameter database(s) to load.
+    merge (bool, optional): Merge the external database(s) onto the bundled parameters (True),
+      or only use the external database(s) (False).
   """
 
-  def __init__(self, database_path=None):
-    #Columns:
-    #Parameter	LongName	Name	Available	Group0	Group1	Group2	Process	FBnr	VarType	VarType2	VarLength	Min	Max	Read	Write	Poll	Advanced	Secured	Highly secured	Default	Description
-    # Import database
-    parm_list      = parameters.parameters
-    self.parm_vals = parameters.values
-    self.dde_dict  = {}
-    self.pp_dict   = {}
-    # Create dicts for faster access to parameters
-    for parm in self.__rows_to_parms(parm_list):
+  # Fields of parameter and value rows
+  PARM_FIELDS  = ('dde_nr', 'proc_nr', 'parm_nr', 'parm_type', 'parm_name', 'parm_size', 'writable')
+  VALUE_FIELDS = ('description', 'filter', 'id', 'name', 'parameter', 'value')
+
+  # FlowDDE variable types, converted to types of the bundled database
+  FLOWDDE_TYPES = {'c': 'Byte',
+                   'i': 'UInt16',
+                   'l': 'UInt32',
+                   'f': 'Float',
+                   's': 'String'}
+
+  # Indexes that are built on first use
+  VALUE_INDEXES = ('parm_vals', 'values_dict', 'value_dict', 'description_dict')
+  NAME_INDEXES  = ('search_names', 'search_trigrams', 'name_dict', 'normalized_name_dict')
+
+  def __init__(self, database_path=None, merge=True):
+    # Load the database
+    if merge:
+      tables = self.__build_tables()
+    else:
+      tables = ((), ())
+    # Load and merge the external databases
+    if database_path is not None:
+      if isinstance(database_path, (str, bytes, os.PathLike)):
+        database_path = [database_path]
+      for path in database_path:
+        tables = self.__merge_tables(tables, self.__build_external_tables(path))
+    parm_list, value_list = tables
+    parm_list         = [self.__row_to_parm(row) for row in parm_list]
+    self.__value_rows = value_list
+    self.dde_dict     = {}
+    self.pp_dict      = {}
+    # Value decoders are compiled on first use
+    self.value_decoders = {}
+    # Create dicts for faster access to parameters (parameters are read-only)
+    for parm in parm_list:
+      parm = types.MappingProxyType(parm)
       # Create dde dict
       self.dde_dict[parm['dde_nr']] = parm
       # Create propar dict
@@ -846,7 +2725,143 @@ class database(object):
       if parm_nr not in self.pp_dict[proc_nr].keys():
         self.pp_dict[proc_nr][parm_nr] = []
       self.pp_dict[proc_nr][parm_nr].append(parm)
-
+    for parms in self.pp_dict.values():
+      for parm_nr, definitions in parms.items():
+        parms[parm_nr] = tuple(definitions)
+    # Create flat dict with the preferred (first) parameter per process, parameter number
+    self.propar_dict = {(proc_nr, parm_nr): definitions[0] for proc_nr, parms in self.pp_dict.items() for parm_nr, definitions in parms.items()}
+
+  def __getattr__(self, name):
+    """Build the value indexes or name indexes on first use."""
+    if name in self.VALUE_INDEXES:
+      self.__build_value_indexes()
+    elif name in self.NAME_INDEXES:
+      self.__build_name_indexes()
+    else:
+      raise AttributeError(name)
+    return self.__dict__[name]
+
+  def __build_value_indexes(self):
+    """Create the (read-only) values, and indexes by dde_nr, (dde_nr, value) and (dde_nr, description)."""
+    parm_vals        = tuple(types.MappingProxyType(dict(zip(self.VALUE_FIELDS, row))) for row in self.__value_rows)
+    values_dict      = {}
+    value_dict       = {}
+    description_dict = {}
+    for row in parm_vals:
+      dde_nr = int(row['parameter'])
+      values_dict.setdefault(dde_nr, []).append(row)
+      value_dict.setdefault((dde_nr, int(row['value'])), []).append(row)
+      description_dict.setdefault((dde_nr, row['description'].lower()), []).append(row)
+    for index in (values_dict, value_dict, description_dict):
+      for key, rows in index.items():
+        index[key] = tuple(rows)
+    self.parm_vals        = parm_vals
+    self.values_dict      = values_dict
+    self.value_dict       = value_dict
+    self.description_dict = description_dict
+
+  def __build_name_indexes(self):
+    """Create search index, normalized names and trigrams of the normalized names,
+    and name indexes (exact and normalized, the first parameter with a name is used).
+    """
+    search_names         = {}
+    search_trigrams      = {}
+    name_dict            = {}
+    normalized_name_dict = {}
+    for dde_nr, parm in self.dde_dict.items():
+      name = self.__normalize_name(parm['parm_name'])
+      search_names[dde_nr] = name
+      name_dict.setdefault(parm['parm_name'], parm)
+      normalized_name_dict.setdefault(name, parm)
+      for trigram in self.__trigrams(name):
+        search_trigrams.setdefault(trigram, []).append(dde_nr)
+    self.search_names         = search_names
+    self.search_trigrams      = search_trigrams
+    self.name_dict            = name_dict
+    self.normalized_name_dict = normalized_name_dict
+
+  def __build_tables(self):
+    """Build the tables of the database from the parameters module.
+    Returns parameter rows and value rows as tuples (see PARM_FIELDS and VALUE_FIELDS).
+    """
+    from . import parameters
+    parm_rows  = tuple(tuple(parm.get(field) for field in self.PARM_FIELDS) for parm in self.__rows_to_parms(parameters.parameters))
+    value_rows = tuple(tuple(value[field] for field in self.VALUE_FIELDS) for value in parameters.values)
+    return parm_rows, value_rows
+
+  def __build_external_tables(self, path):
+    """Build the tables of the database from an external (JSON or CSV) database.
+    Returns parameter rows and value rows as tuples (see PARM_FIELDS and VALUE_FIELDS).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+      if extension == '.json':
+        data = json.load(f)
+        if isinstance(data, dict):
+          parm_rows  = data.get('parameters', [])
+          value_rows = data.get('values', [])
+        else:
+          parm_rows  = data
+          value_rows = []
+      elif extension in ('.csv', '.tsv', '.txt'):
+        dialect = csv.Sniffer().sniff(f.read(4096), delimiters='\t,;')
+        f.seek(0)
+        rows = list(csv.DictReader(f, dialect=dialect))
+        if rows and all(field in rows[0] for field in self.VALUE_FIELDS):
+          parm_rows  = []
+          value_rows = rows
+        else:
+          parm_rows  = rows
+          value_rows = []
+      else:
+        raise ValueError('Unsupported parameter database format: {}'.format(path))
+    try:
+      parms  = self.__rows_to_parms([self.__flowdde_row(row) for row in parm_rows])
+      values = [self.__value_row(row) for row in value_rows]
+    except (KeyError, TypeError, ValueError) as e:
+      raise ValueError('Invalid parameter database {}: {!r}'.format(path, e))
+    parm_rows  = tuple(tuple(parm.get(field) for field in self.PARM_FIELDS) for parm in parms)
+    value_rows = tuple(tuple(value[field] for field in self.VALUE_FIELDS) for value in values)
+    return parm_rows, value_rows
+
+  def __flowdde_row(self, row):
+    """Convert a parameter row with FlowDDE columns to the format of the bundled database."""
+    if 'ProPar' in row:
+      return row
+    length = row.get('VarLength')
+    return {'Name'     : row.get('LongName') or row['Name'],
+            'Parameter': int(row['Parameter']),
+            'Type'     : self.FLOWDDE_TYPES.get(row['VarType'], row['VarType']),
+            'Length'   : int(length) if length not in (None, '') else None,
+            'ProPar'   : {'Process'  : int(row['Process']),
+                          'Parameter': int(row['FBnr'])},
+            'Write'    : row.get('Write')}
+
+  def __value_row(self, row):
+    """Convert a (CSV or JSON) value row to the format of the bundled database."""
+    value = {field: row.get(field) or '' for field in ('description', 'filter', 'name')}
+    value['id'       ] = int(row['id']) if row.get('id') not in (None, '') else None
+    value['parameter'] = int(row['parameter'])
+    value['value'    ] = int(row['value'])
+    return value
+
+  def __merge_tables(self, tables, overlay):
+    """Merge the overlay tables onto tables, rows of overlay parameters (by DDE nr) are replaced."""
+    parm_rows,     value_rows     = tables
+    overlay_parms, overlay_values = overlay
+    dde_nrs = {row[self.PARM_FIELDS.index('dde_nr')] for row in overlay_parms}
+    parm_rows  = tuple(row for row in parm_rows if row[self.PARM_FIELDS.index('dde_nr')] not in dde_nrs) + tuple(overlay_parms)
+    dde_nrs = {row[self.VALUE_FIELDS.index('parameter')] for row in overlay_values}
+    value_rows = tuple(row for row in value_rows if row[self.VALUE_FIELDS.index('parameter')] not in dde_nrs) + tuple(overlay_values)
+    return parm_rows, value_rows
+
+  def __row_to_parm(self, row):
+    """Create a parameter object from a parameter row."""
+    parm = dict(zip(self.PARM_FIELDS, row))
+    for field in ('parm_size', 'writable'):
+      if parm[field] is None:
+        del parm[field]
+    return parm
 
   def __rows_to_parms(self, rows):
     type_conv = {'Byte': PP_TYPE_INT8,
@@ -863,6 +2878,8 @@ class database(object):
       dde_nr = int(r['Parameter'])
       proc_nr = int(r['ProPar']['Process'])
       parm_nr = int(r['ProPar']['Parameter'])
+      if r['Type'] not in type_conv:
+        raise ValueError('Unknown type {} of DDE parameter {}'.format(r['Type'], dde_nr))
       parm_type = type_conv[r['Type']]
       parm_name = r['Name']
       # Set extended int types if required.
@@ -875,8 +2892,10 @@ class database(object):
           'parm_type': parm_type,
           'parm_name': parm_name
         }
-      if r['Type'] == 'BinaryString' and r['Length'] != None:
+      if r['Type'] == 'BinaryString' and r.get('Length') != None:
         p['parm_size'] = int(r['Length'])
+      if r.get('Write') not in (None, ''):
+        p['writable'] = str(r['Write']).strip().lower() in ('1', 'true', 'yes', 'y', 'x')
       # Skip certain legacy definitions
       if p['dde_nr'] == 278 and p['parm_type'] != PP_TYPE_INT32:
         continue
@@ -886,48 +2905,139 @@ class database(object):
       parms.append(p)
     return parms
 
-  def get_all_parameters(self):
-    """Get a list containing all known parameter objects."""
-    return [dict(obj) for obj in self.dde_dict.values()]
+  @staticmethod
+  def __view(parm, copy):
+    """Get a (modifiable) copy of a database parameter, or the shared read-only parameter itself."""
+    return dict(parm) if copy else parm
+
+  def get_all_parameters(self, copy=True):
+    """Get a list containing all known parameter objects.
 
-  def get_parameters(self, dde_parameter_nrs):
+    Args:
+      copy (bool, optional): Return modifiable copies (True) or the shared read-only parameter objects (False).
+    """
+    return [self.__view(obj, copy) for obj in self.dde_dict.values()]
+
+  def get_parameters(self, dde_parameter_nrs, copy=True):
     """Get propar parameter objects from a list of DDE nrs.
 
     Args:
       dde_parameter_nrs (list:int): List of DDE nrs.
+      copy (bool, optional): Return modifiable copies (True) or the shared read-only parameter objects (False).
 
     Returns:
       A list of corresponding propar parameter objects.
     """
     parms = []
     for dde_nr in dde_parameter_nrs:
-      parms.append(self.get_parameter(dde_nr))
+      parms.append(self.get_parameter(dde_nr, copy))
     return parms
 
-  def get_parameter(self, dde_parameter_nr):
+  def get_parameter(self, dde_parameter_nr, copy=True):
     """Get a propar parameter object for the given DDE nrs.
 
     Args:
       dde_parameter_nr (int): DDE nrs.
+      copy (bool, optional): Return a modifiable copy (True) or the shared read-only parameter object (False).
 
     Returns:
       A propar parameter object.
     """
-    return dict(self.dde_dict[dde_parameter_nr])
+    return self.__view(self.dde_dict[dde_parameter_nr], copy)
+
+  def get_parameter_by_name(self, name, copy=True):
+    """Get a propar parameter object by name. An exact name is found first,
+    otherwise the name is compared without case and spaces.
+
+    Args:
+      name (str): Parameter name.
+      copy (bool, optional): Return a modifiable copy (True) or the shared read-only parameter object (False).
 
-  def get_parameters_like(self, like_this):
+    Returns:
+      A propar parameter object.
+
+    Raises:
+      KeyError: When no parameter has the given name.
+    """
+    parm = self.name_dict.get(name)
+    if parm is None:
+      parm = self.normalized_name_dict[self.__normalize_name(name)]
+    return self.__view(parm, copy)
+
+  def get_parameters_like(self, like_this, copy=True):
     """Get a list of propar parameter objects that match the like_this argument.
 
     Args:
       like_this (str): String to find in parameter name.
+      copy (bool, optional): Return modifiable copies (True) or the shared read-only parameter objects (False).
 
     Returns:
       A list of matching propar parameter objects.
     """
-    like_this =  like_this.lower().replace(' ', '')
-    parms = [dict(obj) for obj in self.dde_dict.values() if like_this in obj['parm_name'].lower().replace(' ', '')]
+    like_this = self.__normalize_name(like_this)
+    parms = [self.__view(self.dde_dict[dde_nr], copy) for dde_nr, name in self.search_names.items() if like_this in name]
     return parms
 
+  def search_parameters(self, query, limit=10, min_similarity=0.4, copy=True):
+    """Search parameters by name, tolerant to typos. Results are ranked by relevance.
+
+    Exact matches rank first, followed by names starting with the query, names containing
+    the query, and finally names that are similar to the query (trigram similarity).
+
+    Args:
+      query (str): (Part of the) name to search for (case and spaces are ignored).
+      limit (int, optional): Maximum number of results (None for all results).
+      min_similarity (float, optional): Minimum similarity (0-1) of names that do not contain the query.
+      copy (bool, optional): Return modifiable copies (True) or the shared read-only parameter objects (False).
+
+    Returns:
+      A list of matching propar parameter objects, best match first.
+    """
+    query = self.__normalize_name(query)
+    if not query:
+      return []
+    trigrams = self.__trigrams(query)
+    # Count shared trigrams for all candidates
+    hits = {}
+    for trigram in trigrams:
+      for dde_nr in self.search_trigrams.get(trigram, ()):
+        hits[dde_nr] = hits.get(dde_nr, 0) + 1
+    # Short queries have few trigrams, check all names for the query
+    if len(query) < 3:
+      for dde_nr, name in self.search_names.items():
+        if query in name:
+          hits.setdefault(dde_nr, 0)
+    results = []
+    for dde_nr, count in hits.items():
+      name = self.search_names[dde_nr]
+      if name == query:
+        score = 4.0
+      elif name.startswith(query):
+        score = 3.0
+      elif query in name:
+        score = 2.0
+      else:
+        # Dice coefficient of the trigrams
+        score = 2.0 * count / (len(trigrams) + len(self.__trigrams(name)))
+        if score < min_similarity:
+          continue
+      results.append((-score, len(name), dde_nr))
+    results.sort()
+    if limit is not None:
+      results = results[:limit]
+    return [self.__view(self.dde_dict[dde_nr], copy) for score, length, dde_nr in results]
+
+  @staticmethod
+  def __normalize_name(name):
+    """Normalize a parameter name for searching (lower case, without spaces)."""
+    return name.lower().replace(' ', '')
+
+  @staticmethod
+  def __trigrams(name):
+    """Get the set of trigrams of a normalized name, including begin and end markers."""
+    name = '^' + name + '$'
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
   def get_parameter_values(self, dde_parameter_nr):
     """Get a list of possible values for for the given DDE nr..
 
@@ -935,23 +3045,67 @@ class database(object):
       dde_parameter_nr (int): DDE nr.
 
     Returns:
-      A list with possible values.
+      A tuple with possible values (read-only value objects).
     """
-    rows = [dict(obj) for obj in self.parm_vals if int(obj['parameter']) == dde_parameter_nr]
-    return rows
+    return self.values_dict.get(dde_parameter_nr, ())
 
-  def get_propar_parameter(self, proc_nr, parm_nr):
+  def get_parameter_value(self, dde_parameter_nr, value):
+    """Get the value objects for the given DDE nr and value, for example to get the description of a value.
+
+    Parameters with bit masks (filter) can have multiple value objects for the same value.
+
+    Args:
+      dde_parameter_nr (int): DDE nr.
+      value (int): Parameter value.
+
+    Returns:
+      A tuple with matching value objects (read-only), empty when the value is unknown.
+    """
+    return self.value_dict.get((dde_parameter_nr, value), ())
+
+  def get_parameter_value_by_description(self, dde_parameter_nr, description):
+    """Get the value objects for the given DDE nr with the given description (case insensitive).
+
+    Args:
+      dde_parameter_nr (int): DDE nr.
+      description (str): Description of the value.
+
+    Returns:
+      A tuple with matching value objects (read-only), empty when the description is unknown.
+    """
+    return self.description_dict.get((dde_parameter_nr, description.lower()), ())
+
+  def get_value_decoder(self, dde_parameter_nr):
+    """Get the (compiled) value decoder for the given DDE nr, to decode raw values to descriptions.
+
+    Args:
+      dde_parameter_nr (int): DDE nr.
+
+    Returns:
+      A value_decoder object, or None when the parameter has no values.
+    """
+    try:
+      return self.value_decoders[dde_parameter_nr]
+    except KeyError:
+      pass
+    values  = self.get_parameter_values(dde_parameter_nr)
+    decoder = value_decoder(values) if values else None
+    self.value_decoders[dde_parameter_nr] = decoder
+    return decoder
+
+  def get_propar_parameter(self, proc_nr, parm_nr, copy=True):
     """Get a list of possible propar parameter objects for the given process, parameter number combination.
 
     Args:
       proc_nr (int): Process number.
       parm_nr (int): Parameter number.
+      copy (bool, optional): Return modifiable copies (True) or the shared read-only parameter objects (False).
 
     Returns:
       A list with propar parameter objects.
     """
     try:
-      return [dict(obj) for obj in self.pp_dict[proc_nr][parm_nr]]
+      return [self.__view(obj, copy) for obj in self.pp_dict[proc_nr][parm_nr]]
     except:
       return None
 
@@ -962,10 +3116,10 @@ class database(object):
       proc_nr (int): Process number.
 
     Returns:
-      A list with processes, with a list of propar parameter objects per process.
+      A read-only dict with parameter numbers, with a tuple of read-only propar parameter objects per parameter number.
     """
     try:
-      return self.pp_dict[process]
+      return types.MappingProxyType(self.pp_dict[process])
     except:
       return None
 
@@ -1030,26 +3184,23 @@ class _propar_builder(object):
     send_message['len' ] = 0
 
     pos               = 0
-    message           = [0 for x in range(0, 255)]
     max_message_len   = 255
+    message           = bytearray(max_message_len)
 
     proc_index        = 0
     parm_index        = 0
     parm_chained      = False
     prev_parm_chained = False
 
-    org_type          = 0
-
     if command is None:
       command = PP_COMMAND_SEND_PARM
 
     for parameter in parameters:
       values_ok = False
 
-      if   parameter['parm_type'] == PP_TYPE_FLOAT:
-        parm_type = PP_TYPE_INT32
-      elif parameter['parm_type'] in [PP_TYPE_SINT16, PP_TYPE_BSINT16]:
-        parm_type = PP_TYPE_INT16
+      codec = _PP_CODECS.get(parameter['parm_type'])
+      if codec is not None:
+        parm_type = codec.wire_type
       else:
         parm_type = parameter['parm_type']
 
@@ -1082,84 +3233,55 @@ class _propar_builder(object):
         if parameter['parm_chained']:
           parm_index = parm_index | 0x80
 
-        if (parm_chained and (max_message_len - pos) >= 2) or (not parm_chained and (max_message_len - pos) >= 3):
+        # the parameter header (process and parameter byte) and value must fit in the message
+        needed = (1 if prev_parm_chained else 2) + (codec.size if codec is not None else 1)
+        if max_message_len - pos < needed:
+          raise ValueError('Parameters do not fit in propar message! ({} bytes free, {} needed)'.format(max_message_len - pos, needed))
 
-          if prev_parm_chained == False:
-            message[pos] = proc_index
-            pos += 1
+        if prev_parm_chained == False:
+          message[pos] = proc_index
+          pos += 1
 
-          prev_parm_chained = parameter['parm_chained']
+        prev_parm_chained = parameter['parm_chained']
 
-          message[pos] = parm_index | parm_type
-          pos += 1
+        message[pos] = parm_index | parm_type
+        pos += 1
 
-          if parm_type == PP_TYPE_INT8:
-            if (max_message_len - pos) >= 1:
-              if isinstance(parameter['data'], bytes):
-                message[pos] = parameter['data'][0]
-              else:
-                message[pos] = parameter['data']
-              pos += 1
+        if codec is not None:
+          data = parameter['data']
+          if parm_type == PP_TYPE_INT8 and isinstance(data, bytes):
+            data = data[0]
+          # values out of range for the type are sent as zero
+          pos = codec.pack_into(message, pos, data)
 
-          if parm_type == PP_TYPE_INT16:
-            if (max_message_len - pos) >= 2:
-              try:
-                data = struct.unpack('2B', struct.pack('h', parameter['data']))
-              except:
-                try:
-                  data = struct.unpack('2B', struct.pack('H', parameter['data']))
-                except:
-                  data = [0, 0]
-              for byte in reversed(data):
-                message[pos] = byte
-                pos += 1
-
-          if parm_type == PP_TYPE_INT32:
-            if (max_message_len - pos) >= 4:
-              if parameter['parm_type'] == PP_TYPE_FLOAT:
-                try:
-                  data = struct.unpack('4B', struct.pack('f', parameter['data']))
-                except:
-                  data = [0, 0, 0, 0]
-              else:
-                try:
-                  data = struct.unpack('4B', struct.pack('i', parameter['data']))
-                except:
-                  try:
-                    data = struct.unpack('4B', struct.pack('I', parameter['data']))
-                  except:
-                    data = [0, 0, 0, 0]
-              for byte in reversed(data):
-                message[pos] = byte
-                pos += 1
-
-          if parm_type == PP_TYPE_STRING:
-            if (max_message_len - pos) >= 1:
-              len_pos = pos
-              pos += 1
-              # get bytes
-              if type(parameter['data']) is str:
-                str_bytes = parameter['data'].encode('utf-8')
-              elif type(parameter['data']) is bytes:
-                str_bytes = parameter['data']
-              else:
-                str_bytes = str(parameter['data']).encode('utf-8')
-              # get string length
-              len_str = parameter['parm_size']
-              message[len_pos] = len_str
-              # pad with spaces if needed
-              if len_str > len(str_bytes):
-                str_bytes += b' ' * (len_str - len(str_bytes))
-              # adjust string length to parm_size
-              for c in str_bytes:
-                message[pos] = c
-                pos += 1
-              # zero terminate the string
-              if len_str == 0 and message[pos  - 1] != 0:
-                message[pos] = 0
-                pos += 1
-
-    send_message['data'] = message[0:pos]
+        if parm_type == PP_TYPE_STRING:
+          len_pos = pos
+          pos += 1
+          # get bytes
+          if type(parameter['data']) is str:
+            str_bytes = parameter['data'].encode('utf-8')
+          elif type(parameter['data']) is bytes:
+            str_bytes = parameter['data']
+          else:
+            str_bytes = str(parameter['data']).encode('utf-8')
+          # get string length
+          len_str = parameter['parm_size']
+          message[len_pos] = len_str
+          # pad with spaces if needed
+          if len_str > len(str_bytes):
+            str_bytes += b' ' * (len_str - len(str_bytes))
+          # the string (and zero terminator) must fit in the message
+          if pos + len(str_bytes) + (1 if len_str == 0 else 0) > max_message_len:
+            raise ValueError('String parameter too long for propar message! ({} bytes)'.format(len(str_bytes)))
+          # adjust string length to parm_size
+          message[pos:pos+len(str_bytes)] = str_bytes
+          pos += len(str_bytes)
+          # zero terminate the string
+          if len_str == 0 and (len(str_bytes) == 0 or str_bytes[-1] != 0):
+            message[pos] = 0
+            pos += 1
+
+    send_message['data'] = bytes(message[0:pos])
     send_message['len' ] = pos
 
     return send_message
@@ -1174,9 +3296,9 @@ class _propar_builder(object):
     request_message['len' ] = 0
 
     pos               = 0
-    message           = [0 for x in range(0, 255)]
     message_len       = 0
     max_message_len   = 255
+    message           = bytearray(max_message_len)
     build_ok          = False
 
     parm_chained      = False
@@ -1188,10 +3310,9 @@ class _propar_builder(object):
 
       parm_chained = False
 
-      if   parameter['parm_type'] == PP_TYPE_FLOAT:
-        parm_type = PP_TYPE_INT32
-      elif parameter['parm_type'] in [PP_TYPE_SINT16, PP_TYPE_BSINT16]:
-        parm_type = PP_TYPE_INT16
+      codec = _PP_CODECS.get(parameter['parm_type'])
+      if codec is not None:
+        parm_type = codec.wire_type
       else:
         parm_type = parameter['parm_type']
 
@@ -1252,20 +3373,28 @@ class _propar_builder(object):
           if build_ok:
             message_len = pos
 
-    request_message['data'] = message[0:message_len]
+    request_message['data'] = bytes(message[0:message_len])
     request_message['len' ] = message_len
     return request_message
 
 
-  def read_pp_send_parameter_message(self, propar_message):
+  def read_pp_send_parameter_message(self, propar_message, parm_types=None):
     """Read parameter_objects from send parameter propar_message.
     Function returns a list of parameter_objects, with the sent data in the parameter_object['data'] field.
     If an error occurs during processing the error will be stored in the parameter_object['status'] field.
+    The message data is parsed in place (as bytes), values are unpacked directly from the buffer.
+    When parm_types (requested types, in message order) is passed, values are decoded as these types
+    (e.g. PP_TYPE_FLOAT instead of PP_TYPE_INT32) when they match the type on the wire.
     """
     read_status = PP_STATUS_OK
 
-    message_len = propar_message['len' ]
-    message     = propar_message['data']
+    message = propar_message['data']
+    if not isinstance(message, bytes):
+      message = bytes(message)
+    view = memoryview(message)
+
+    # Never read beyond the received data, even when the length field claims more
+    message_len = min(propar_message['len'], len(message))
 
     pos = 0
 
@@ -1305,75 +3434,65 @@ class _propar_builder(object):
         pos += 1
         parm_chained = ((parm_nr & 0x80) != 0x00)
 
-        parameter['parm_type']    = parm_nr & 0x60
+        parm_type                 = parm_nr & 0x60
+        parameter['parm_type']    = parm_type
         parameter['parm_nr']      = parm_nr & 0x1F
         parameter['parm_index']   = parm_nr
 
         parameter['proc_chained'] = proc_chained
         parameter['parm_chained'] = parm_chained
 
+        codec = _PP_CODECS.get(parm_type)
+        if parm_types is not None and len(parameters) < len(parm_types):
+          requested = _PP_CODECS.get(parm_types[len(parameters)])
+          if requested is not None and requested.wire_type == parm_type:
+            codec = requested
 
-        if parameter['parm_type'] == PP_TYPE_INT8:
-          parameter['parm_size'] = 1
-          if (message_len - pos) < parameter['parm_size']:
-            read_status = PP_ERROR_PROTOCOL_ERROR
-          else:
-            parameter['data'] = message[pos]
-            pos += 1
-
-        elif parameter['parm_type'] == PP_TYPE_INT16:
-          parameter['parm_size'] = 2
-          if (message_len - pos) < parameter['parm_size']:
-            read_status = PP_ERROR_PROTOCOL_ERROR
-          else:
-            parameter['data'] = int.from_bytes(bytes(message[pos:pos+2]), byteorder='big')
-            pos += 2
-
-        elif parameter['parm_type'] == PP_TYPE_INT32:
-          parameter['parm_size'] = 4
-          if (message_len - pos) < parameter['parm_size']:
+        if parm_type != PP_TYPE_STRING:
+          parameter['parm_size'] = codec.size
+          if (message_len - pos) < codec.size:
             read_status = PP_ERROR_PROTOCOL_ERROR
           else:
-            parameter['data'] = int.from_bytes(bytes(message[pos:pos+4]), byteorder='big')
-            pos += 4
+            parameter['data'     ] = codec.unpack_from(message, pos)
+            parameter['parm_type'] = codec.parm_type
+            pos += codec.size
 
-        elif parameter['parm_type'] == PP_TYPE_STRING:
+        else:
           if (message_len - pos) < 1:
             read_status = PP_ERROR_PROTOCOL_ERROR
           else:
             # Get string length from message
-            parameter['parm_size'] = message[pos]
+            parm_size = message[pos]
             pos += 1
 
             # Max possible length of current string in this message
             slen = message_len - pos
 
             # Calculate string length (including zero terminator)
-            if parameter['parm_size'] == 0:
-              cnt = pos
-              while message[cnt] != 0 and cnt < message_len:
-                cnt += 1
-              parameter['parm_size'] = cnt - pos
+            if parm_size == 0:
+              end = message.find(0, pos, message_len)
+              if end < 0:
+                end = message_len
+              parm_size = end - pos
               # Data is string + null byte
-              data_size = parameter['parm_size'] + 1
+              data_size = parm_size + 1
             else:
               # Data is string + without null byte
-              data_size = parameter['parm_size']
+              data_size = parm_size
+            parameter['parm_size'] = parm_size
 
             # Check string length
-            if parameter['parm_size'] > slen:
+            if parm_size > slen:
               read_status = PP_ERROR_PROTOCOL_ERROR
-            elif parameter['parm_size'] > MAX_PP_PARM_LEN - 1:
-              # Decode string and store data
-              string_bytes = bytes(message[pos:pos+parameter['parm_size']])
-              parameter['data'] = string_bytes
+            elif parm_size > MAX_PP_PARM_LEN - 1:
+              # Store raw bytes as data
+              parameter['data'] = bytes(view[pos:pos+parm_size])
             else:
-              # Decode string and store data
-              string_bytes = bytes(message[pos:pos+parameter['parm_size']])
+              # Decode string directly from the buffer and store data
               try:
-                parameter['data'] = string_bytes.decode('utf-8')
-              except:
-                parameter['data'] = string_bytes
+                parameter['data'] = str(view[pos:pos+parm_size], 'utf-8')
+              except UnicodeDecodeError:
+                parameter['data'] = bytes(view[pos:pos+parm_size])
 
             # Increase pos for messsage decoding
             pos += data_size
@@ -1471,6 +3590,114 @@ class _propar_builder(object):
 
 
 
+def decode_parameter_messages(messages, parameters=None):
+  """Decode a batch of send parameter messages with the same layout into a NumPy structured array.
+
+  Intended for high rate captures of the same request (or broadcast), where all messages
+  have an identical byte layout. The layout is read from the first message, after which
+  all values are decoded at once, including big endian and float/signed reinterpretation.
+
+  This requires NumPy, install with ``pip install bronkhorst-propar[numpy]``.
+
+  Args:
+    messages (list): Propar messages (dicts with a 'data' field) or raw message data.
+    parameters (list, optional): Requested parameter objects, in message order. Used for the
+      column names (parm_name) and for the requested types (PP_TYPE_FLOAT, PP_TYPE_SINT16, PP_TYPE_BSINT16).
+
+  Returns:
+    NumPy structured array, with one row per message and one column per parameter.
+
+  Raises:
+    ValueError: When the messages are not valid send parameter messages with the same layout.
+  """
+  try:
+    import numpy as np
+  except ImportError:
+    raise ImportError('decode_parameter_messages requires numpy (pip install bronkhorst-propar[numpy])')
+
+  payloads = [bytes(message['data']) if isinstance(message, dict) else bytes(message) for message in messages]
+  if len(payloads) == 0:
+    raise ValueError('No messages to decode!')
+
+  # Read the layout from the first message
+  first      = payloads[0]
+  parm_types = None
+  if parameters is not None:
+    parm_types = [parameter['parm_type'] for parameter in parameters]
+  layout = _propar_builder().read_pp_send_parameter_message({'len': len(first), 'data': first}, parm_types)
+  if len(layout) == 0 or any(parameter['status'] != PP_STATUS_OK for parameter in layout):
+    raise ValueError('First message is not a valid send parameter message!')
+
+  message_len = len(first)
+  if any(len(payload) != message_len for payload in payloads):
+    raise ValueError('Messages do not share the same layout!')
+
+  wire_formats = {PP_TYPE_INT8   : ('u1' , 'u1'),
+                  PP_TYPE_INT16  : ('>u2', 'u2'),
+                  PP_TYPE_SINT16 : ('>i2', 'i2'),
+                  PP_TYPE_BSINT16: ('>u2', 'i4'),
+                  PP_TYPE_INT32  : ('>u4', 'u4'),
+                  PP_TYPE_FLOAT  : ('>f4', 'f4')}
+
+  names       = []
+  wire_dtypes = []
+  out_dtypes  = []
+  offsets     = []
+  structure   = [True] * message_len   # positions that are not part of a value
+  strings     = []                     # positions of zero terminated strings
+  pos = 1
+  for i, parameter in enumerate(layout):
+    # skip process (when not chained to the previous parameter) and parameter byte
+    if i == 0 or not layout[i - 1]['parm_chained']:
+      pos += 1
+    pos += 1
+    size = parameter['parm_size']
+    if parameter['parm_type'] == PP_TYPE_STRING:
+      if first[pos] == 0:
+        # zero terminated string, must have the same length in all messages
+        strings.append((pos + 1, pos + 1 + size))
+      pos += 1
+      wire_dtype = out_dtype = 'S{}'.format(max(size, 1))
+    else:
+      wire_dtype, out_dtype = wire_formats[parameter['parm_type']]
+    structure[pos:pos + size] = [False] * size
+
+    name = None
+    if parameters is not None and i < len(parameters):
+      name = parameters[i].get('parm_name')
+    if name is None:
+      name = '{}_{}'.format(parameter['proc_nr'], parameter['parm_nr'])
+    if name in names:
+      name = '{}_{}'.format(name, i)
+    names.append(name)
+    wire_dtypes.append(wire_dtype)
+    out_dtypes.append(out_dtype)
+    offsets.append(pos)
+    pos = parameter['status_pos']
+
+  raw = np.frombuffer(b''.join(payloads), dtype=np.uint8).reshape(len(payloads), message_len)
+
+  # All messages must have the same commands, process/parameter numbers and string sizes
+  structure = np.array(structure)
+  if not (raw[:, structure] == raw[0, structure]).all():
+    raise ValueError('Messages do not share the same layout!')
+  for begin, end in strings:
+    if not (raw[:, begin:end] != 0).all():
+      raise ValueError('Messages do not share the same layout!')
+
+  wire = raw.reshape(-1).view(np.dtype({'names': names, 'formats': wire_dtypes, 'offsets': offsets, 'itemsize': message_len}))
+  result = np.empty(len(payloads), dtype=list(zip(names, out_dtypes)))
+  for name, parameter in zip(names, layout):
+    if parameter['parm_type'] == PP_TYPE_BSINT16:
+      values = wire[name].astype('i4')
+      result[name] = np.where(values > 0xA3D6, values - 0xFFFF, values)
+    else:
+      result[name] = wire[name]
+  return result
+
+
+
+
 class _propar_provider(object):
   """Implements the propar interface for master or slave"""
 
@@ -1593,6 +3820,20 @@ class _propar_provider(object):
     propar_message is a dictionary containing the message seq, node, len, and
     data. This is converted to a binary or ascii propar message before sending.
     """
+    self.serial.write(self.__encode_propar_message(propar_message))
+
+
+  def write_propar_messages(self, propar_messages):
+    """Writes multiple propar messages to the serial port, back-to-back in a single write.
+    Only supported in binary mode (ascii mode has no sequence numbers to match the replies).
+    """
+    if self.mode != PP_MODE_BINARY:
+      raise Exception("Writing multiple propar messages requires binary mode!")
+    self.serial.write(b''.join([self.__encode_propar_message(propar_message) for propar_message in propar_messages]))
+
+
+  def __encode_propar_message(self, propar_message):
+    """Converts a propar message to a binary or ascii propar message (bytes)."""
     if ('seq'  not in propar_message or
         'node' not in propar_message or
         'len'  not in propar_message or
@@ -1627,7 +3868,7 @@ class _propar_provider(object):
       if self.debug:
         print("TX ({:3d}): {:}".format(len(msg), ' '.join(["{:02X}".format(x) for x in msg])))
 
-      self.serial.write(bytes(msg))
+      return bytes(msg)
 
     else:
       # no sequence in ascii mode, but we need it to match in master
@@ -1638,7 +3879,7 @@ class _propar_provider(object):
       msg  = ':{:02X}{:02X}{:}\r\n'.format(propar_message['len'] + 1, propar_message['node'], data)
       if self.debug:
         print("TX ({:3d}):".format(len(msg)), bytes(msg, encoding='ascii'))
-      self.serial.write(bytes(msg, encoding='ascii'))
+      return bytes(msg, encoding='ascii')
 
 
   def read_propar_message(self):
@@ -1699,7 +3940,7 @@ class _propar_provider(object):
             propar_message['seq' ] = self.__receive_buffer[0 ]
             propar_message['node'] = self.__receive_buffer[1 ]
             propar_message['len' ] = self.__receive_buffer[2 ]
-            propar_message['data'] = self.__receive_buffer[3:]
+            propar_message['data'] = bytes(self.__receive_buffer[3:])
             self.__receive_queue.append(propar_message)
             if self.debug:
               l = self.__receive_buffer.count(0x10) + len(self.__receive_buffer)
@@ -25,4 +25,7 @@ setuptools.setup(
     install_requires=[
         'pyserial',
     ],
+    extras_require={
+        'numpy': ['numpy'],
+    },
 )
\ No newline at end of file
@@ -0,0 +1,57 @@
+import propar
+
+from serial_simulator import simulated_serial, default_node
+
+print()
+print(propar.__file__)
+print()
+
+simulated_serial.nodes[0x80] = {(0, 1): (propar.PP_TYPE_INT8, 0x80)}  # local host
+simulated_serial.nodes[3]    = default_node()
+dut    = propar.instrument('availability_tests', address=3, serial_class=simulated_serial)
+master = dut.master
+port   = master.propar.serial
+master.response_timeout = 0.05
+master.availability     = propar.parameter_availability()
+
+def identity_requests(node):
+  """Number of requests of the device type (identity) of node since the last check."""
+  requests = [frame for frame in port.frames if frame['node'] == node and frame['data'][0] == propar.PP_COMMAND_REQUEST_PARM and
+              any((p['proc_nr'], p['parm_nr']) == (113, 1) for p in master.propar_builder.read_pp_request_parameter_message(frame))]
+  port.frames.clear()
+  return len(requests)
+
+user_tag = {'proc_nr': 113, 'parm_nr': 6, 'parm_type': propar.PP_TYPE_STRING, 'parm_size': 0}
+
+# The identity is requested once
+assert master.read_parameters([dict(user_tag, node=3)])[0]['data'] == 'tag'
+assert identity_requests(3) == 1
+assert master.read_parameters([dict(user_tag, node=3)])[0]['data'] == 'tag'
+assert identity_requests(3) == 0
+
+# A node that does not respond is not asked for its identity again within identity_retry
+assert master.read_parameters([dict(user_tag, node=5)])[0]['status'] == propar.PP_STATUS_TIMEOUT_ANSWER
+assert identity_requests(5) == 1
+assert master.read_parameters([dict(user_tag, node=5)])[0]['status'] == propar.PP_STATUS_TIMEOUT_ANSWER
+assert identity_requests(5) == 0
+master.identity_retry = 0
+assert master.read_parameters([dict(user_tag, node=5)])[0]['status'] == propar.PP_STATUS_TIMEOUT_ANSWER
+assert identity_requests(5) == 1
+master.identity_retry = 5.0
+
+# A node that stops responding may be replaced, its identity is requested again
+simulated_serial.muted.add(3)
+assert master.read_parameters([dict(user_tag, node=3)])[0]['status'] == propar.PP_STATUS_TIMEOUT_ANSWER
+simulated_serial.muted.discard(3)
+port.frames.clear()
+assert master.read_parameters([dict(user_tag, node=3)])[0]['data'] == 'tag'
+assert identity_requests(3) == 1
+
+# Nodes found by get_nodes are asked for their identity again
+nodes = master.get_nodes()
+assert [node['address'] for node in nodes] == [3], nodes
+port.frames.clear()
+assert master.read_parameters([dict(user_tag, node=3)])[0]['data'] == 'tag'
+assert identity_requests(3) == 1
+
+print('availability tests done')
@@ -0,0 +1,118 @@
+import propar
+import sys
+import time
+import tracemalloc
+
+# Offline test and benchmark of the propar message builder and parsers.
+# Does not require an instrument, all messages are checked against golden frames.
+
+print()
+print(propar.__file__)
+
+builder = propar._propar_builder()
+
+def parm(proc_nr, parm_nr, parm_type, data, parm_size=None):
+  if parm_size is None:
+    parm_size = {propar.PP_TYPE_INT8: 1, propar.PP_TYPE_INT16: 2, propar.PP_TYPE_SINT16: 2, propar.PP_TYPE_BSINT16: 2,
+                 propar.PP_TYPE_INT32: 4, propar.PP_TYPE_FLOAT: 4, propar.PP_TYPE_STRING: 0}[parm_type]
+  return {'node': 3, 'proc_nr': proc_nr, 'parm_nr': parm_nr, 'parm_type': parm_type, 'parm_size': parm_size,
+          'proc_index': proc_nr, 'parm_index': parm_nr, 'data': data}
+
+# name, parameters, send parameter message (hex), request parameter message (hex)
+golden = [
+  ('int8',           [parm(  1,  4, propar.PP_TYPE_INT8   ,          9)],
+                     '02010409', '0401040104'),
+  ('int16',          [parm(  1,  1, propar.PP_TYPE_INT16  ,      32000)],
+                     '0201217d00', '0401210121'),
+  ('sint16',         [parm(  1,  1, propar.PP_TYPE_SINT16 ,      -1000)],
+                     '020121fc18', '0401210121'),
+  ('bsint16',        [parm(  1,  0, propar.PP_TYPE_BSINT16,      41942)],
+                     '020120a3d6', '0401200120'),
+  ('int32',          [parm(114,  1, propar.PP_TYPE_INT32  ,  123456789)],
+                     '027241075bcd15', '0472417241'),
+  ('float',          [parm( 33,  0, propar.PP_TYPE_FLOAT  ,        1.5)],
+                     '0221403fc00000', '0421402140'),
+  ('string',         [parm(113,  6, propar.PP_TYPE_STRING , 'Hello World!')],
+                     '0271660048656c6c6f20576f726c642100', '047166716600'),
+  ('string sized',   [parm(  1, 17, propar.PP_TYPE_STRING , 'N2        ', 10)],
+                     '0201710a4e322020202020202020', '04017101710a'),
+  ('chained',        [parm( 33,  0, propar.PP_TYPE_FLOAT  ,        1.5),
+                      parm( 33,  3, propar.PP_TYPE_FLOAT  ,      -2.25),
+                      parm( 33,  7, propar.PP_TYPE_FLOAT  ,       21.0),
+                      parm(114,  1, propar.PP_TYPE_INT32  ,          7)],
+                     '02a1c03fc00000c3c01000004741a80000724100000007', '04a1c02140c3214347214772417241'),
+  ('chained mixed',  [parm(  1,  1, propar.PP_TYPE_INT16  ,      16000),
+                      parm(  1,  4, propar.PP_TYPE_INT8   ,          0),
+                      parm(  1, 17, propar.PP_TYPE_STRING , 'Air       ', 10),
+                      parm(113,  6, propar.PP_TYPE_STRING ,      'tag'),
+                      parm(113,  3, propar.PP_TYPE_STRING ,    'M1234'),
+                      parm( 33,  3, propar.PP_TYPE_FLOAT  ,      100.0)],
+                     '0281a13e808400710a41697220202020202020f1e6007461670063004d3132333400214342c80000',
+                     '0481a101218401047101710af1e67166006371630021432143'),
+  ('maximum length', [parm(113,  6, propar.PP_TYPE_STRING ,  'x' * 247, 247)],
+                     '027166f7' + '78' * 247, '0471667166f7'),
+]
+
+def message(data):
+  return {'seq': 0, 'node': 3, 'len': len(data), 'data': data}
+
+# Check builders and parsers against the golden frames
+errors = 0
+for name, parameters, send_hex, request_hex in golden:
+  send    = builder.build_pp_send_parameter_message({'seq': 0, 'node': 3}, [dict(p) for p in parameters], propar.PP_COMMAND_SEND_PARM)
+  request = builder.build_pp_request_parameter_message({'seq': 0, 'node': 3}, [dict(p) for p in parameters])
+  if bytes(send['data']).hex() != send_hex or send['len'] != len(send_hex) // 2:
+    print('{:<20}send parameter message differs from golden frame'.format(name))
+    errors += 1
+  if bytes(request['data']).hex() != request_hex or request['len'] != len(request_hex) // 2:
+    print('{:<20}request parameter message differs from golden frame'.format(name))
+    errors += 1
+  received = builder.read_pp_send_parameter_message(message(bytes.fromhex(send_hex)), [p['parm_type'] for p in parameters])
+  if [(r['proc_nr'], r['parm_nr'], r['parm_type'], r['data']) for r in received] != [(p['proc_nr'], p['parm_nr'], p['parm_type'], p['data']) for p in parameters]:
+    print('{:<20}parsed send parameter message differs from golden parameters'.format(name))
+    errors += 1
+  requested = list(builder.read_pp_request_parameter_message(message(bytes.fromhex(request_hex))))
+  if [(r['proc_nr'], r['parm_nr'], r['status']) for r in requested] != [(p['proc_nr'], p['parm_nr'], propar.PP_STATUS_OK) for p in parameters]:
+    print('{:<20}parsed request parameter message differs from golden parameters'.format(name))
+    errors += 1
+
+print()
+print("propar builder golden frames: {:} frames, {:} errors".format(len(golden), errors))
+
+if errors:
+  sys.exit(1)
+
+n = 2000
+print()
+print("propar builder performance test")
+print()
+print("testing with n =", n)
+print()
+
+def benchmark(name, function, frames):
+  # time per message
+  bt = time.perf_counter()
+  for i in range(n):
+    for frame in frames:
+      function(frame)
+  et = time.perf_counter()
+  # allocations per message (peak memory and memory blocks kept by the results)
+  tracemalloc.start()
+  blocks  = sys.getallocatedblocks()
+  results = [function(frame) for frame in frames]
+  blocks  = sys.getallocatedblocks() - blocks
+  peak    = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  del results
+  print("{:<50}{:>12}{:>12}{:>12}".format(name, '{:3.0f}ns'.format((et-bt) / n / len(frames) * 1000000000),
+                                          '{:3.0f}B'.format(peak / len(frames)), '{:3.1f}'.format(blocks / len(frames))))
+
+print("{:<50}{:>12}{:>12}{:>12}".format('', 'time/msg', 'peak/msg', 'blocks/msg'))
+for name, parameters, send_hex, request_hex in golden:
+  types = [p['parm_type'] for p in parameters]
+  benchmark('build send ({:})'.format(name), lambda p: builder.build_pp_send_parameter_message({'seq': 0, 'node': 3}, p, propar.PP_COMMAND_SEND_PARM), [parameters])
+  benchmark('build request ({:})'.format(name), lambda p: builder.build_pp_request_parameter_message({'seq': 0, 'node': 3}, p), [parameters])
+  benchmark('read send ({:})'.format(name), lambda m: builder.read_pp_send_parameter_message(m, types), [message(bytes.fromhex(send_hex))])
+  benchmark('read request ({:})'.format(name), lambda m: list(builder.read_pp_request_parameter_message(m)), [message(bytes.fromhex(request_hex))])
+
+print()
@@ -0,0 +1,73 @@
+import propar
+
+from serial_simulator import simulated_serial, simulated_clock, default_node, wait_until
+
+print()
+print(propar.__file__)
+print()
+
+clock       = propar.time = simulated_clock()
+node        = simulated_serial.nodes[3] = default_node()
+dut         = propar.instrument('cache_tests', address=3, serial_class=simulated_serial)
+port        = dut.master.propar.serial
+dut.cache   = propar.parameter_cache(ttl=0.2, ttls={206: 1.0})
+
+# Values are read once, until the TTL expires
+assert dut.measure == 16000 and dut.measure == 16000
+assert port.requests() == 1
+clock.advance(0.15)
+node[(1, 0)] = (propar.PP_TYPE_INT16, 17000)
+assert dut.measure == 16000
+assert port.requests() == 0
+clock.advance(0.1)
+assert dut.measure == 17000
+assert port.requests() == 1
+
+# TTL per DDE nr
+assert dut.readParameter(206) == 2.5
+clock.advance(0.5)
+assert dut.readParameter(206) == 2.5
+assert port.requests() == 1
+clock.advance(0.6)
+assert dut.readParameter(206) == 2.5
+assert port.requests() == 1
+
+# Identity parameters never expire
+assert dut.readParameter(92) == 'M12345678A'
+clock.advance(3600)
+assert dut.readParameter(92) == 'M12345678A'
+assert port.requests() == 1
+
+# Written parameters are invalidated
+assert dut.setpoint == 32000
+dut.setpoint = 12345
+assert dut.setpoint == 12345
+assert port.requests() == 2
+
+# Channels are cached separately
+assert dut.readChannels(205, [1, 2]) == {1: 1.5, 2: 7.5}
+assert dut.readChannels(205, [1, 2]) == {1: 1.5, 2: 7.5}
+assert port.requests() == 1
+
+# Broadcasts refresh the cache (channel 1 and 2, and an integer sent as its wire type)
+port.broadcast(3, [{'proc_nr': 33, 'parm_nr': 0, 'parm_type': propar.PP_TYPE_FLOAT, 'parm_size': 4, 'data': 9.5},
+                   {'proc_nr': 34, 'parm_nr': 0, 'parm_type': propar.PP_TYPE_FLOAT, 'parm_size': 4, 'data': 3.25},
+                   {'proc_nr':  1, 'parm_nr': 0, 'parm_type': propar.PP_TYPE_INT16, 'parm_size': 2, 'data': 20000}])
+wait_until(lambda: dut.cache.get((8, 1)) == 20000)
+assert dut.readChannels(205, [1, 2]) == {1: 9.5, 2: 3.25}
+assert dut.measure == 20000
+assert port.requests() == 0
+
+# Broadcasts of other nodes are ignored
+port.broadcast(4, [{'proc_nr': 1, 'parm_nr': 0, 'parm_type': propar.PP_TYPE_INT16, 'parm_size': 2, 'data': 1}])
+port.broadcast(3, [{'proc_nr': 1, 'parm_nr': 1, 'parm_type': propar.PP_TYPE_INT16, 'parm_size': 2, 'data': 2}])
+wait_until(lambda: dut.cache.get((9, 1)) == 2)
+assert dut.measure == 20000
+
+# Disabled cache reads every time
+dut.cache = None
+assert dut.master.broadcast_listeners == []
+assert dut.measure == 17000 and dut.measure == 17000
+assert port.requests() == 2
+
+print('cache tests done')
@@ -0,0 +1,56 @@
+import propar
+
+from serial_simulator import simulated_serial, simulated_clock, default_node, wait_until
+
+print()
+print(propar.__file__)
+print()
+
+clock = propar.time = simulated_clock()
+node  = simulated_serial.nodes[3] = default_node()
+dut   = propar.instrument('change_tests', address=3, serial_class=simulated_serial)
+
+# Deadband (absolute) and percent (of the last passed on value)
+deadband = propar.change_filter(deadband=0.5)
+assert [deadband.changed(value) for value in (1.0, 1.25, 1.5, 1.75, 2.5, 2.0, 1.75)] == [True, False, False, True, True, False, True]
+percent = propar.change_filter(percent=10)
+assert [percent.changed(value) for value in (100, 109, 111, 121, 123, 135.5)] == [True, False, True, False, True, True]
+# Without deadband and percent any change is passed on, also for values that are not numbers
+any_change = propar.change_filter()
+assert [any_change.changed(value) for value in (5, 5, 4, 4, 'a', 'a', None)] == [True, False, True, False, True, False, True]
+
+# Changes within min_interval are held back, the latest value is passed on afterwards
+interval = propar.change_filter(deadband=0.1, min_interval=1.0)
+assert interval.changed(1.0)
+assert not interval.changed(2.0)
+clock.advance(0.5)
+assert not interval.changed(3.0)
+clock.advance(0.5)
+assert interval.changed(3.0) and interval.value == 3.0
+clock.advance(1.0)
+assert not interval.changed(3.05)
+
+# Subscriptions only notify significant changes
+changes = []
+alarms  = []
+flow    = dut.subscribe_changes(205, 1.0, callback=lambda sub, result: changes.append(result['data']), deadband=0.5)
+alarm   = dut.subscribe_changes(28, 1.0, callback=lambda sub, result: alarms.append(result['data']))
+values  = [1.5, 1.75, 2.0, 2.25, 1.0, 1.25, 5.0]
+for i, value in enumerate(values):
+  node[(33, 0)] = (propar.PP_TYPE_FLOAT, value)
+  if i == 3:
+    node[(1, 20)] = (propar.PP_TYPE_INT8, 4)
+  wait_until(lambda: flow.reads == i + 1 and alarm.reads == i + 1)
+  clock.advance(1.0)
+assert changes == [1.5, 2.25, 1.0, 5.0], changes
+assert alarms == [5, 4], alarms
+assert flow.notifications == 4 and alarm.notifications == 2
+
+# Failed reads are not passed on
+simulated_serial.muted.add(3)
+dut.master.response_timeout = 0.05
+wait_until(lambda: flow.reads == len(values) + 1)
+assert flow.failures == 1 and flow.notifications == 4
+dut.master.scheduler.stop()
+
+print('change tests done')
@@ -0,0 +1,56 @@
+import propar
+
+from serial_simulator import simulated_serial, default_node
+
+print()
+print(propar.__file__)
+print()
+
+# Simulated instrument with three channels (channel 3 without setpoint)
+node = default_node()
+node.update({(2,  0): (propar.PP_TYPE_INT16, 8000),
+             (2,  1): (propar.PP_TYPE_INT16, 9000),
+             (3,  0): (propar.PP_TYPE_INT16, 100),
+             (35, 0): (propar.PP_TYPE_FLOAT, 9.25)})
+simulated_serial.nodes[3] = node
+dut  = propar.instrument('channel_tests', address=3, serial_class=simulated_serial)
+port = dut.master.propar.serial
+dut.master.response_timeout = 0.05
+
+dde_nrs  = [8, 9, 205, 206, 92]
+channels = [1, 2, 3]
+port.requests()
+expected = {channel: {dde_nr: dut.readParameter(dde_nr, channel=channel) for dde_nr in dde_nrs} for channel in channels}
+assert port.requests() == len(channels) * len(dde_nrs)
+assert expected == {1: {8: 16000, 9: 32000, 205: 1.5,  206: 2.5,  92: 'M12345678A'},
+                    2: {8: 8000,  9: 9000,  205: 7.5,  206: 3.5,  92: 'M12345678A'},
+                    3: {8: 100,   9: None,  205: 9.25, 206: None, 92: 'M12345678A'}}, expected
+
+# Packed read of all channels gives the same values as reading each parameter of each channel
+assert dut.readChannels(dde_nrs, channels) == expected
+port.requests()
+assert dut.readChannels(dde_nrs, channels[:2]) == {channel: expected[channel] for channel in channels[:2]}
+assert port.requests() == 1
+for dde_nr in dde_nrs:
+  assert dut.readChannels(dde_nr, channels) == {channel: expected[channel][dde_nr] for channel in channels}
+assert dut.readChannels(205, [2]) == {2: 7.5}
+
+# Same as readParameters per channel
+for channel in channels:
+  assert dut.readParameters(dde_nrs, channel=channel) == expected[channel]
+
+# With the value cache
+dut.cache = propar.parameter_cache(ttl=60)
+assert dut.readChannels(dde_nrs, channels) == expected
+port.requests()
+assert dut.readChannels(dde_nrs, channels) == expected
+assert port.requests(3) == 3   # the parameters that are not available on channel 3 (packed, then one by one)
+dut.cache = None
+
+try:
+  dut.readChannels([8, 99999], channels)
+  assert False, 'unknown parameter accepted'
+except ValueError:
+  pass
+
+print('channel tests done')
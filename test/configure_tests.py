@@ -0,0 +1,76 @@
+import struct
+
+import propar
+
+from serial_simulator import simulated_serial, default_node
+
+print()
+print(propar.__file__)
+print()
+
+node = simulated_serial.nodes[3] = default_node()
+dut  = propar.instrument('configure_tests', address=3, serial_class=simulated_serial)
+port = dut.master.propar.serial
+
+def written():
+  """(proc_nr, parm_nr) of the parameters written since the last call, per message."""
+  messages = [[(parm['proc_nr'], parm['parm_nr']) for parm in dut.master.propar_builder.read_pp_send_parameter_message(frame)]
+              for frame in port.frames if frame['data'][0] == propar.PP_COMMAND_SEND_PARM_WITH_ACK]
+  port.frames.clear()
+  return messages
+
+# Nothing is written when all parameters have the desired value (strings without padding, floats as sent)
+node[(33, 3)] = (propar.PP_TYPE_FLOAT, struct.unpack('>f', struct.pack('>f', 0.1))[0])
+report = dut.configure({9: 32000, 206: 0.1, 'fluid name': 'N2', 115: 'tag\x00', 'Capacity Unit': 'ln/min'})
+assert report == {'unchanged': [9, 206, 'fluid name', 115, 'Capacity Unit'], 'changed': {}, 'failed': {}, 'success': True}, report
+assert written() == []
+
+# Only changed parameters are written (in the given order, packed) and read back
+report = dut.configure({115: 'new tag', 9: 32000, 12: 3, 206: 0.1, 25: 'Ar'})
+assert report['unchanged'] == [9, 206]
+assert report['changed'] == {115: ('tag', 'new tag'), 12: (0, 3), 25: ('N2        ', 'Ar')}, report
+assert report['success'] and report['failed'] == {}
+assert written() == [[(113, 6), (1, 4), (1, 17)]]
+assert node[(113, 6)][1] == 'new tag' and node[(1, 4)][1] == 3 and node[(1, 17)][1] == 'Ar'
+
+# Tolerance of numeric values
+node[(33, 3)] = (propar.PP_TYPE_FLOAT, 10.25)
+assert dut.configure({206: 10.0}, tolerance=0.5)['unchanged'] == [206]
+assert dut.configure({206: 10.0}, tolerance=0.1)['changed'] == {206: (10.25, 10.0)}
+assert node[(33, 3)][1] == 10.0
+
+# Parameters that can not be written fail, the other parameters are written one by one
+written()
+report = dut.configure({9: 100, 262: 1, 12: 0})
+assert report['changed'] == {9: (32000, 100), 262: (None, 1), 12: (3, 0)}, report
+assert report['failed'] == {262: (1, None)} and not report['success']
+assert written() == [[(1, 1), (113, 30), (1, 4)], [(1, 1)], [(113, 30)], [(1, 4)]]
+assert node[(1, 1)][1] == 100 and node[(1, 4)][1] == 0
+
+# The instrument does not keep the value
+class ignoring(dict):
+  def __setitem__(self, key, value):
+    if key != (1, 1):
+      dict.__setitem__(self, key, value)
+simulated_serial.nodes[3] = ignoring(node)
+report = dut.configure({9: 200, 12: 1})
+assert report['failed'] == {9: (200, 100)} and not report['success']
+simulated_serial.nodes[3] = node = dict(simulated_serial.nodes[3])
+
+# Cached values are not used to compare, written values are invalidated
+dut.cache = propar.parameter_cache(ttl=60)
+assert dut.readParameter(12) == 1
+node[(1, 4)] = (propar.PP_TYPE_INT8, 5)
+assert dut.configure({12: 5})['unchanged'] == [12]
+assert dut.configure({12: 6})['success'] and dut.readParameter(12) == 6
+dut.cache = None
+
+# Unknown parameters
+for key in (99999, 'no such parameter'):
+  try:
+    dut.configure({key: 1})
+    assert False, 'unknown parameter accepted'
+  except ValueError:
+    pass
+
+print('configure tests done')
@@ -46,10 +46,41 @@ et = time.perf_counter()
 print("{:<50}{:>8}".format("get_propar_parameter for all parmeters"          , '{:3.2f}ns'.format((et-bt) / n * 1000000               )))
 print("{:<50}{:>8}".format("get_propar_parameter for one parameter (average)", '{:3.2f}ns'.format((et-bt) / n * 1000000 / len(dde_nrs))))
 
+bt = time.perf_counter()
+for i in range(n):
+  for dde_nr in dde_nrs:
+    db.get_parameter(dde_nr, copy=False)
+et = time.perf_counter()
+print("{:<50}{:>8}".format("get_parameter (read-only) for all dde_nrs"       , '{:3.2f}ns'.format((et-bt) / n * 1000000               )))
+
+bt = time.perf_counter()
+for i in range(n):
+  for p in all_parameters:
+    db.get_propar_parameter(p['proc_nr'], p['parm_nr'], copy=False)
+et = time.perf_counter()
+print("{:<50}{:>8}".format("get_propar_parameter (read-only) for all parms"  , '{:3.2f}ns'.format((et-bt) / n * 1000000               )))
+
+alarm_info = db.get_value_decoder(28)
+bt = time.perf_counter()
+for i in range(n):
+  alarm_info.decode(0x85)
+et = time.perf_counter()
+print("{:<50}{:>8}".format("value_decoder.decode (alarm info)"               , '{:3.2f}ns'.format((et-bt) / n * 1000000               )))
+
 print()
 
+p = db.get_parameter(8, copy=False)
+try:
+  p['test'] = 9
+  print('read-only parameter modified, breaking stuff...')
+except TypeError:
+  pass
+
 p = db.get_parameter(8)
 p['test'] = 9
 q = db.get_parameter(8)
 if 'test' in q.keys():
-  print('parameter not copied, but reference, breaking stuff...')
\ No newline at end of file
+  print('parameter not copied, but reference, breaking stuff...')
+
+if alarm_info.decode(0x01)[0] != db.get_parameter_value(28, 1)[0]['description']:
+  print('alarm info not decoded, breaking stuff...')
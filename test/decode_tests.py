@@ -0,0 +1,110 @@
+import random
+import subprocess
+import sys
+
+import propar
+
+# Batch decoding (decode_parameter_messages) gives the same values as the per-message parser.
+
+print()
+print(propar.__file__)
+print()
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+# Without NumPy, batch decoding raises a clear ImportError
+code = '''
+import sys
+sys.modules['numpy'] = None
+import propar
+try:
+  propar.decode_parameter_messages([[2]])
+except ImportError as error:
+  print(error)
+'''
+assert 'requires numpy' in subprocess.check_output([sys.executable, '-c', code]).decode()
+
+if np is None:
+  print('numpy is not installed, skipping decode tests')
+  sys.exit(0)
+
+builder = propar._propar_builder()
+sizes   = {propar.PP_TYPE_INT8: 1, propar.PP_TYPE_INT16: 2, propar.PP_TYPE_SINT16: 2, propar.PP_TYPE_BSINT16: 2, propar.PP_TYPE_INT32: 4, propar.PP_TYPE_FLOAT: 4}
+
+def parameter(proc_nr, parm_nr, parm_type, parm_size=None, parm_name=None):
+  return {'proc_nr': proc_nr, 'parm_nr': parm_nr, 'proc_index': proc_nr, 'parm_index': parm_nr, 'parm_type': parm_type,
+          'parm_size': sizes.get(parm_type) if parm_size is None else parm_size, 'parm_name': parm_name}
+
+def value(rnd, parm):
+  if parm['parm_type'] == propar.PP_TYPE_INT8:
+    return rnd.randint(0, 255)
+  if parm['parm_type'] == propar.PP_TYPE_INT16:
+    return rnd.randint(0, 65535)
+  if parm['parm_type'] == propar.PP_TYPE_SINT16:
+    return rnd.choice([-32768, 32767, rnd.randint(-32768, 32767)])
+  if parm['parm_type'] == propar.PP_TYPE_BSINT16:
+    return rnd.choice([-23593, 0, 41942, rnd.randint(-23593, 41942)])
+  if parm['parm_type'] == propar.PP_TYPE_INT32:
+    return rnd.randint(0, 2**32 - 1)
+  if parm['parm_type'] == propar.PP_TYPE_FLOAT:
+    return rnd.uniform(-1e6, 1e6)
+  return ''.join(rnd.choice('abcxyz ') for i in range(parm['parm_size'] or 4))
+
+def messages(parameters, count, seed):
+  rnd = random.Random(seed)
+  return [builder.build_pp_send_parameter_message({'seq': 0, 'node': 3}, [dict(parm, data=value(rnd, parm)) for parm in parameters], propar.PP_COMMAND_SEND_PARM)
+          for i in range(count)]
+
+def same(row, parsed):
+  for name, parm in zip(row.dtype.names, parsed):
+    data = row[name]
+    if isinstance(data, bytes):
+      data = data.decode('utf-8')
+    if data != parm['data']:
+      return False
+  return True
+
+layouts = [[parameter(1, 0, propar.PP_TYPE_BSINT16, parm_name='Measure'), parameter(1, 1, propar.PP_TYPE_INT16, parm_name='Setpoint'),
+            parameter(33, 0, propar.PP_TYPE_FLOAT, parm_name='Fmeasure'), parameter(33, 3, propar.PP_TYPE_FLOAT, parm_name='Fsetpoint')],
+           [parameter(1, 2, propar.PP_TYPE_SINT16), parameter(113, 6, propar.PP_TYPE_STRING, 8), parameter(113, 7, propar.PP_TYPE_STRING, 0),
+            parameter(114, 1, propar.PP_TYPE_INT8), parameter(114, 2, propar.PP_TYPE_INT32), parameter(1, 3, propar.PP_TYPE_INT8)]]
+for n, parameters in enumerate(layouts):
+  captured = messages(parameters, 500, n)
+  types    = [parm['parm_type'] for parm in parameters]
+  # Propar messages (with parameter names), and raw message data (without parameters, columns named after proc_nr and parm_nr)
+  for batch, names in ((propar.decode_parameter_messages(captured, parameters), [parm['parm_name'] for parm in parameters]),
+                       (propar.decode_parameter_messages([bytes(message['data']) for message in captured]), None)):
+    assert len(batch) == len(captured)
+    if names is not None and None not in names:
+      assert list(batch.dtype.names) == names
+    for message, row in zip(captured, batch):
+      assert same(row, builder.read_pp_send_parameter_message(message, types if names is not None else None)), (row, message)
+
+# Messages with another layout are rejected, and are decoded with the per-message parser instead
+parameters = layouts[1]
+types      = [parm['parm_type'] for parm in parameters]
+captured   = messages(parameters, 10, 10)
+other      = [messages([parameter(1, 2, propar.PP_TYPE_SINT16)], 1, 11)[0],                                                  # shorter
+              messages(parameters[:1] + [parameter(113, 8, propar.PP_TYPE_STRING, 8)] + parameters[2:], 1, 12)[0],           # other parameter number
+              builder.build_pp_send_parameter_message({'seq': 0, 'node': 3}, [dict(parm, data=value(random.Random(13), parm)) for parm in parameters[:2]] +
+                                                      [dict(parameters[2], data='ab\x00d')] + [dict(parm, data=0) for parm in parameters[3:]],
+                                                      propar.PP_COMMAND_SEND_PARM)]                                          # string terminated earlier, same length
+for message in other:
+  mixed = captured[:5] + [message] + captured[5:]
+  try:
+    batch = propar.decode_parameter_messages(mixed, parameters)
+    assert False, 'mixed layouts decoded'
+  except ValueError:
+    batch = [builder.read_pp_send_parameter_message(m, types) for m in mixed]
+  assert [[parm['data'] for parm in parsed] for parsed in batch[:5] + batch[6:]] == \
+         [[parm['data'] for parm in builder.read_pp_send_parameter_message(m, types)] for m in captured]
+try:
+  propar.decode_parameter_messages([])
+  assert False, 'no messages decoded'
+except ValueError:
+  pass
+
+print('decode tests done')
@@ -0,0 +1,66 @@
+import propar
+
+from serial_simulator import simulated_serial, default_node
+
+print()
+print(propar.__file__)
+print()
+
+for address in (3, 4, 5):
+  simulated_serial.nodes[address] = default_node()
+dut    = propar.instrument('group_tests', address=3, serial_class=simulated_serial)
+master = dut.master
+port   = master.propar.serial
+master.response_timeout = 0.05
+
+setpoint  = master.db.get_parameter(9)
+fsetpoint = master.db.get_parameter(206)
+
+def sent():
+  """(command, node) of the messages sent since the last call, and the number of writes to the serial port."""
+  frames = [(frame['data'][0], frame['node']) for frame in port.frames]
+  writes = port.writes
+  port.frames.clear()
+  port.writes = 0
+  return frames, writes
+
+# Messages of all nodes are sent in a single write (in order of the nodes), acknowledges are collected afterwards
+sent()
+report = master.write_group({node: [dict(setpoint, data=node * 100), dict(fsetpoint, data=node + 0.5)] for node in (5, 3, 4)})
+assert sent() == ([(propar.PP_COMMAND_SEND_PARM_WITH_ACK, node) for node in (5, 3, 4)], 1)
+assert report['broadcast'] is False and report['status'] == {5: 0, 3: 0, 4: 0} and report['ack_spread'] is not None
+assert [simulated_serial.nodes[node][(1, 1)][1] for node in (3, 4, 5)] == [300, 400, 500]
+assert [simulated_serial.nodes[node][(33, 3)][1] for node in (3, 4, 5)] == [3.5, 4.5, 5.5]
+
+# Status per node, nodes that do not answer time out
+unknown = {'proc_nr': 113, 'parm_nr': 30, 'parm_type': propar.PP_TYPE_INT8, 'parm_size': 1, 'data': 1}
+report  = master.write_group({3: [dict(setpoint, data=1)], 4: [unknown], 6: [dict(setpoint, data=1)]})
+assert report['status'] == {3: propar.PP_STATUS_OK, 4: propar.PP_STATUS_PARM_NUMBER, 6: propar.PP_STATUS_TIMEOUT_ANSWER}, report
+assert sent()[1] == 1
+
+# Without acknowledge, all messages are sent and nothing is collected
+report = master.write_group({node: [dict(setpoint, data=node)] for node in (3, 4, 5)}, command=propar.PP_COMMAND_SEND_PARM)
+assert sent() == ([(propar.PP_COMMAND_SEND_PARM, node) for node in (3, 4, 5)], 1)
+assert report['status'] == {3: 0, 4: 0, 5: 0} and report['ack_spread'] is None
+assert [simulated_serial.nodes[node][(1, 1)][1] for node in (3, 4, 5)] == [3, 4, 5]
+
+# The same parameters and data for all nodes are sent as a single broadcast
+report = master.write_group({node: [dict(setpoint, data=16000), dict(fsetpoint, data=1.25)] for node in (3, 4, 5)}, broadcast_node=0x80)
+assert sent() == ([(propar.PP_COMMAND_SEND_PARM_BROADCAST, 0x80)], 1)
+assert report['broadcast'] is True and report['status'] == {3: 0, 4: 0, 5: 0}
+assert [simulated_serial.nodes[node][(1, 1)][1] for node in (3, 4, 5)] == [16000] * 3
+assert [simulated_serial.nodes[node][(33, 3)][1] for node in (3, 4, 5)] == [1.25] * 3
+
+# Different data (or parameters) per node falls back to messages per node
+report = master.write_group({node: [dict(setpoint, data=16000), dict(fsetpoint, data=node)] for node in (3, 4, 5)}, broadcast_node=0x80)
+assert sent() == ([(propar.PP_COMMAND_SEND_PARM_WITH_ACK, node) for node in (3, 4, 5)], 1)
+assert report['broadcast'] is False and report['status'] == {3: 0, 4: 0, 5: 0}
+report = master.write_group({3: [dict(setpoint, data=1)], 4: [dict(fsetpoint, data=1)]}, broadcast_node=0x80)
+assert sent() == ([(propar.PP_COMMAND_SEND_PARM_WITH_ACK, node) for node in (3, 4)], 1)
+assert report['broadcast'] is False
+
+# Nothing to write
+assert master.write_group({}) == {'broadcast': False, 'status': {}, 'tx_time': 0.0, 'ack_spread': None}
+assert sent() == ([], 0)
+
+print('group tests done')
@@ -0,0 +1,48 @@
+import subprocess
+import sys
+
+# Cold start test: time to import propar and to load the parameter database in a new process.
+# The indexes by name and the indexes of the parameter values are built on first use, loading
+# the database (without using these) must be faster than loading it with all indexes built.
+
+n = 10
+
+code = '''
+import time
+bt = time.perf_counter()
+import propar
+et = time.perf_counter()
+db = propar.database()
+{:}
+dt = time.perf_counter()
+print(et - bt, dt - et)
+'''
+
+def cold_start(use=''):
+  imported, loaded = subprocess.check_output([sys.executable, '-c', code.format(use)]).split()
+  return float(imported), float(loaded)
+
+print()
+print("propar cold start performance test")
+print()
+print("testing with n =", n)
+print()
+
+imported = []
+lazy     = []
+indexed  = []
+for i in range(n):
+  import_time, load_time = cold_start()
+  imported.append(import_time)
+  lazy.append(load_time)
+  import_time, load_time = cold_start("db.search_parameters('setpoint'); db.get_parameter_value(28, 1)")
+  imported.append(import_time)
+  indexed.append(load_time)
+
+print("{:<50}{:>8}".format("import"                                , '{:3.2f}ms'.format(min(imported) * 1000)))
+print("{:<50}{:>8}".format("database"                              , '{:3.2f}ms'.format(min(lazy) * 1000)))
+print("{:<50}{:>8}".format("database (with name and value indexes)", '{:3.2f}ms'.format(min(indexed) * 1000)))
+print()
+
+# The best of n runs, so a busy machine does not make the test fail
+assert min(lazy) < min(indexed) * 0.8, (min(lazy), min(indexed))
@@ -0,0 +1,69 @@
+import random
+import propar
+
+from serial_simulator import simulated_serial, default_node
+
+print()
+print(propar.__file__)
+print()
+
+simulated_serial.nodes[3] = default_node()
+dut    = propar.instrument('packed_tests', address=3, serial_class=simulated_serial)
+master = dut.master
+port   = master.propar.serial
+
+# A batch that packs exactly to the maximum message length (255 bytes): all parameters are written
+user_tag = {'node': 3, 'proc_nr': 113, 'parm_nr': 6, 'parm_type': propar.PP_TYPE_STRING, 'parm_size': 0, 'data': 'x' * 248}
+limit    = {'proc_nr': 113, 'parm_nr': 7, 'parm_type': propar.PP_TYPE_INT8, 'data': 42}
+port.frames.clear()
+status = master.write_parameters_packed([user_tag, limit])
+assert status == propar.PP_STATUS_OK, status
+assert [frame['len'] for frame in port.frames] == [255], [frame['len'] for frame in port.frames]
+assert simulated_serial.nodes[3][(113, 6)][1] == 'x' * 248
+assert simulated_serial.nodes[3][(113, 7)][1] == 42
+
+# One more byte does not fit, the last parameter is sent in a second message
+port.frames.clear()
+status = master.write_parameters_packed([dict(user_tag, data='y' * 249), dict(limit, data=43)])
+assert status == propar.PP_STATUS_OK, status
+assert len(port.frames) == 2, [frame['len'] for frame in port.frames]
+assert simulated_serial.nodes[3][(113, 7)][1] == 43
+
+# The builder raises instead of dropping parameters that do not fit
+builder = propar._propar_builder()
+try:
+  builder.build_pp_send_parameter_message({'seq': 0, 'node': 3}, [dict(user_tag, proc_index=113, parm_index=6, data='z' * 249),
+                                                                  dict(limit, proc_index=113, parm_index=7, parm_size=1)], propar.PP_COMMAND_SEND_PARM)
+  assert False, 'parameter dropped from message'
+except ValueError:
+  pass
+
+# Random batches: every batch of the packer builds to a message with all its parameters
+rnd   = random.Random(1)
+types = [propar.PP_TYPE_INT8, propar.PP_TYPE_INT16, propar.PP_TYPE_INT32, propar.PP_TYPE_FLOAT, propar.PP_TYPE_STRING]
+pack  = master._master__pack
+for n in range(1000):
+  parameters = []
+  for i in range(rnd.randint(1, 40)):
+    parm_type = rnd.choice(types)
+    parameter = {'proc_nr': rnd.choice([1, 33, 113, 114]), 'parm_nr': rnd.randint(0, 31), 'parm_type': parm_type, 'parm_size': 0, 'data': rnd.randint(0, 100)}
+    if parm_type == propar.PP_TYPE_STRING:
+      parameter['parm_size'] = rnd.choice([0, 0, 10, 20])
+      parameter['data']      = 'x' * rnd.randint(0, parameter['parm_size'] or rnd.choice([20, 250]))
+    parameter['proc_index'] = parameter['proc_nr']
+    parameter['parm_index'] = parameter['parm_nr']
+    parameters.append(parameter)
+  for batch in pack(parameters, read=False):
+    message  = builder.build_pp_send_parameter_message({'seq': 0, 'node': 3}, [dict(parameters[i]) for i in batch], propar.PP_COMMAND_SEND_PARM)
+    received = builder.read_pp_send_parameter_message(dict(message, data=list(message['data'])))
+    assert message['len'] <= 255 and len(received) == len(batch), (message['len'], len(received), len(batch))
+
+# Empty input
+assert master.read_parameters_packed([]) == []
+assert master.write_parameters_packed([]) == propar.PP_STATUS_OK
+assert dut.readParameters([]) == {}
+assert dut.writeParameters({}) is True
+assert dut.snapshot(dde_nrs=[]).parameters == {}
+assert dut.configure({})['success']
+
+print('packed tests done')
@@ -18,4 +18,11 @@ for i in range(n):
 et = time.perf_counter()
 
 print("{:<20}{:>8}".format("read all parameters", (et - bt)                       / n))
-print("{:<20}{:>8}".format("read one parameter ", (et - bt) / len(all_parameters) / n))
\ No newline at end of file
+print("{:<20}{:>8}".format("read one parameter ", (et - bt) / len(all_parameters) / n))
+dut.master.availability = propar.parameter_availability()
+bt = time.perf_counter()
+for i in range(n):
+  dut.snapshot()
+et = time.perf_counter()
+
+print("{:<20}{:>8}".format("snapshot", (et - bt) / n))
@@ -0,0 +1,100 @@
+import time
+
+import propar
+
+from serial_simulator import simulated_serial, simulated_clock, default_node, wait_until
+
+print()
+print(propar.__file__)
+print()
+
+clock = propar.time = simulated_clock()
+node  = simulated_serial.nodes[3] = default_node()
+dut   = propar.instrument('ramp_tests', address=3, serial_class=simulated_serial)
+port  = dut.master.propar.serial
+dut.master.response_timeout = 0.05
+
+def written():
+  """Number of setpoint messages sent since the last call, and the commands used."""
+  commands = [frame['data'][0] for frame in port.frames if frame['data'][0] != propar.PP_COMMAND_REQUEST_PARM]
+  port.frames.clear()
+  return commands
+
+# Curves
+finished = []
+ramp = dut.ramp_setpoint(10.0, 4.0, start=2.0, interval=1000.0, callback=finished.append)
+assert [ramp.setpoint(elapsed) for elapsed in (0, 1, 2, 4, 5)] == [2.0, 4.0, 6.0, 10.0, 10.0]
+ramp.cancel()
+ramp = dut.ramp_setpoint(10.0, 4.0, curve='s-curve', start=2.0, interval=1000.0)
+assert [ramp.setpoint(elapsed) for elapsed in (0, 1, 2, 4)] == [2.0, 3.25, 6.0, 10.0]
+ramp.cancel()
+ramp = dut.ramp_setpoint(10.0, 4.0, curve=[(0.5, 0.5), (0, 0.25)], start=2.0, interval=1000.0)
+assert [ramp.setpoint(elapsed) for elapsed in (0, 1.5, 2, 3.5, 4)] == [4.0, 4.0, 6.0, 6.0, 10.0]
+ramp.cancel()
+ramp = dut.ramp_setpoint(1000, 3.0, dde_nr=9, start=0, interval=1000.0)
+assert [ramp.setpoint(elapsed) for elapsed in (0, 1, 2, 3)] == [0, 333, 667, 1000]
+ramp.cancel()
+assert len(finished) == 1 and ramp.finished and ramp.wait(0)
+try:
+  dut.ramp_setpoint(10.0, 4.0, curve='square')
+  assert False, 'unknown curve accepted'
+except ValueError:
+  pass
+written()
+
+# Setpoints are written by the scheduler, at the time elapsed since the start (starting at the current setpoint)
+ramp = dut.ramp_setpoint(6.5, 4.0, interval=1.0, callback=finished.append)
+assert ramp.start == 2.5
+wait_until(lambda: ramp.writes == 1)
+assert node[(33, 3)][1] == 2.5
+clock.advance(1.0)
+wait_until(lambda: ramp.writes == 2)
+assert node[(33, 3)][1] == 3.5
+# Late steps do not delay the rest of the ramp
+clock.advance(2.5)
+wait_until(lambda: ramp.writes == 3)
+assert node[(33, 3)][1] == 6.0
+clock.advance(1.0)
+assert ramp.wait(2.0) and finished[1:] == [ramp]
+assert ramp.writes == 4 and ramp.value == 6.5 and node[(33, 3)][1] == 6.5
+assert written() == [propar.PP_COMMAND_SEND_PARM_WITH_ACK] * 4
+# The ramp is removed from the scheduler
+clock.advance(1.0)
+time.sleep(0.05)
+assert ramp.writes == 4 and written() == []
+
+# Unchanged setpoints are not written again, without acknowledge when unacked
+ramp = dut.ramp_setpoint(10.5, 4.0, curve=[(0, 0), (0.5, 0.5)], interval=1.0, unacked=True)
+for writes in (1, 1, 2, 2):
+  wait_until(lambda: ramp.writes == writes)
+  time.sleep(0.05)
+  clock.advance(1.0)
+assert ramp.wait(2.0)
+assert ramp.writes == 3 and node[(33, 3)][1] == 10.5
+assert written() == [propar.PP_COMMAND_SEND_PARM] * 3
+
+# Failed writes are counted, cancelled ramps keep the last setpoint
+ramp = dut.ramp_setpoint(0.5, 4.0, interval=1.0)
+wait_until(lambda: ramp.writes == 1)
+simulated_serial.muted.add(3)
+clock.advance(1.0)
+wait_until(lambda: ramp.writes == 2)
+assert ramp.failures == 1
+simulated_serial.muted.discard(3)
+ramp.cancel()
+assert ramp.finished and ramp.wait(0) and node[(33, 3)][1] == 10.5
+clock.advance(1.0)
+time.sleep(0.05)
+assert ramp.writes == 2
+
+# The current setpoint can not be read
+simulated_serial.muted.add(3)
+try:
+  dut.ramp_setpoint(1.0, 1.0)
+  assert False, 'ramp started without start setpoint'
+except Exception as error:
+  assert 'Unable to read' in str(error)
+simulated_serial.muted.discard(3)
+dut.master.scheduler.stop()
+
+print('ramp tests done')
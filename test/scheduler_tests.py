@@ -0,0 +1,107 @@
+import queue
+import time
+
+import propar
+
+from serial_simulator import simulated_serial, simulated_clock, default_node, wait_until
+
+print()
+print(propar.__file__)
+print()
+
+clock  = propar.time = simulated_clock()
+simulated_serial.nodes[3] = default_node()
+dut    = propar.instrument('scheduler_tests', address=3, serial_class=simulated_serial)
+master = dut.master
+port   = master.propar.serial
+master.response_timeout = 0.05
+start  = clock.now
+
+def idle():
+  """Give the scheduler thread time to run (the simulated clock does not advance)."""
+  time.sleep(0.05)
+
+# Subscriptions of a node with the same period are due at the same time, and read in one message
+got      = []
+results  = queue.Queue()
+measure  = dut.subscribe(8, 1.0, callback=lambda sub, result: got.append(result['data']))
+fmeasure = dut.subscribe(205, 1.0, queue=results)
+wait_until(lambda: measure.reads == 1 and fmeasure.reads == 1)
+assert got == [16000] and results.get_nowait()[1]['data'] == 1.5
+assert port.requests(3) == 1
+
+# Other groups and jobs are spread over their period
+calls = []
+job   = master.scheduler.add_job(0.5, lambda: calls.append(clock.now))
+assert job.next_due == start + 0.5 * master.scheduler.PHASE_STEP
+idle()
+assert calls == []
+clock.advance(0.5)
+wait_until(lambda: job.reads == 1)
+assert calls == [start + 0.5] and measure.reads == 1
+
+clock.advance(0.5)
+wait_until(lambda: measure.reads == 2 and fmeasure.reads == 2 and job.reads == 2)
+assert port.requests(3) == 1
+idle()
+assert measure.reads == 2 and job.reads == 2
+
+# Subscriptions more than a period late skip the missed periods
+clock.advance(3.5)
+wait_until(lambda: measure.reads == 3 and fmeasure.reads == 3)
+idle()
+assert measure.reads == 3 and measure.overruns == 1 and port.requests(3) == 1
+assert measure.next_due == clock.now + 1.0
+
+# Unsubscribed subscriptions are not read anymore
+for sub in (measure, fmeasure, job):
+  master.unsubscribe(sub)
+clock.advance(10.0)
+idle()
+assert measure.reads == 3 and job.reads == 3 and port.requests(3) == 0
+
+# Exceptions of callbacks, jobs and reads are counted, and do not stop the scheduler
+def fail(*args):
+  raise RuntimeError('fail')
+bad_callback  = dut.subscribe(8, 1.0, callback=fail)
+bad_job       = master.scheduler.add_job(1.0, fail)
+bad_parameter = master.scheduler.subscribe(3, {'proc_nr': 33, 'parm_nr': 0, 'parm_type': 'unknown', 'parm_name': 'unknown'}, 1.0)
+good          = dut.subscribe(205, 1.0)
+for i in range(3):
+  clock.advance(1.0)
+  wait_until(lambda: good.reads == i + 1 and bad_callback.reads == i + 1 and bad_job.reads == i + 1 and bad_parameter.errors == i + 1)
+assert bad_callback.errors == 3 and isinstance(bad_callback.last_error, RuntimeError)
+assert bad_job.errors == 3 and bad_job.failures == 3
+assert bad_parameter.reads == 0 and bad_parameter.failures == 3
+assert good.errors == 0 and good.failures == 0 and good.result['data'] == 1.5
+assert master.scheduler.thread.is_alive()
+statistics = {sub['parm_name']: sub for sub in master.scheduler.statistics()['subscriptions']}
+assert statistics['unknown']['errors'] == 3
+
+# Reads of a node that does not respond fail, but are delivered
+simulated_serial.muted.add(3)
+clock.advance(1.0)
+wait_until(lambda: good.reads == 4)
+assert good.failures == 1 and good.result['status'] == propar.PP_STATUS_TIMEOUT_ANSWER
+simulated_serial.muted.discard(3)
+clock.advance(1.0)
+wait_until(lambda: good.reads == 5)
+assert good.failures == 1 and good.result['data'] == 1.5
+
+try:
+  dut.subscribe(205, 0)
+  assert False, 'period of zero accepted'
+except ValueError:
+  pass
+
+# Stopped schedulers do not read, the thread is started again on the next subscription
+master.scheduler.stop()
+assert master.scheduler.thread is None
+clock.advance(1.0)
+idle()
+assert good.reads == 5
+dut.subscribe(9, 1.0)
+wait_until(lambda: good.reads == 6)
+master.scheduler.stop()
+
+print('scheduler tests done')
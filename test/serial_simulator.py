@@ -0,0 +1,174 @@
+# Simulated propar instruments behind a serial port, for offline tests (see serial_class_injection.py).
+#
+# Each node is a dict with (proc_nr, parm_nr): (parm_type, value). Requests to unknown parameters
+# are answered with PP_STATUS_PARM_NUMBER, nodes that are not present (or muted) do not answer.
+# Binary mode only.
+
+import struct
+import threading
+import time
+
+import propar
+
+
+def default_node():
+  """Parameters of a simulated (single channel) mass flow controller."""
+  return {(0,   0): (propar.PP_TYPE_STRING, 'M12345678A'),  # identification string
+          (0,   1): (propar.PP_TYPE_INT8  , 3),             # primary node address
+          (0,   3): (propar.PP_TYPE_INT8  , 0),             # next node address
+          (0,  10): (propar.PP_TYPE_INT8  , 0),             # init reset
+          (1,   0): (propar.PP_TYPE_INT16 , 16000),         # measure
+          (1,   1): (propar.PP_TYPE_INT16 , 32000),         # setpoint
+          (1,   4): (propar.PP_TYPE_INT8  , 0),             # control mode
+          (1,  17): (propar.PP_TYPE_STRING, 'N2        '),  # fluid name
+          (1,  20): (propar.PP_TYPE_INT8  , 5),             # alarm info
+          (1,  31): (propar.PP_TYPE_STRING, 'ln/min '),     # capacity unit
+          (33,  0): (propar.PP_TYPE_FLOAT , 1.5),           # fmeasure
+          (33,  3): (propar.PP_TYPE_FLOAT , 2.5),           # fsetpoint
+          (34,  0): (propar.PP_TYPE_FLOAT , 7.5),           # fmeasure channel 2
+          (34,  3): (propar.PP_TYPE_FLOAT , 3.5),           # fsetpoint channel 2
+          (113, 1): (propar.PP_TYPE_STRING, 'DMFC'),        # device type
+          (113, 3): (propar.PP_TYPE_STRING, 'M12345678A'),  # serial number
+          (113, 5): (propar.PP_TYPE_STRING, 'V1.23'),       # firmware version
+          (113, 6): (propar.PP_TYPE_STRING, 'tag'),         # user tag
+          (113, 7): (propar.PP_TYPE_INT8  , 0)}             # alarm limit maximum (test only)
+
+
+def wait_until(condition, timeout=2.0):
+  """Wait (real time) until condition() is true, for results of the message handler and scheduler threads."""
+  end = time.time() + timeout
+  while not condition():
+    assert time.time() < end, 'timeout'
+    time.sleep(0.001)
+
+
+class simulated_clock():
+  """Monotonic clock that only advances with advance, install with propar.time = simulated_clock().
+  Other functions (time.time for message timeouts, time.sleep) use the real clock.
+  """
+
+  def __init__(self, now=1000.0):
+    self.now = now
+
+  def monotonic(self):
+    return self.now
+
+  def advance(self, seconds):
+    self.now += seconds
+
+  def __getattr__(self, name):
+    return getattr(time, name)
+
+
+class simulated_serial():
+  """Serial port with simulated instruments, the instruments are shared by all ports (see nodes)."""
+
+  # Simulated instruments per node address
+  nodes = {}
+  # Nodes that do not answer
+  muted = set()
+
+  def __init__(self, port, baudrate, **kwargs):
+    self.builder  = propar._propar_builder()
+    self.lock     = threading.Lock()
+    self.buffer   = bytearray()
+    self.frames   = []   # received messages, dict with seq, node, len, data
+    self.writes   = 0    # number of calls to write
+
+  def close(self):
+    pass
+
+  def open(self):
+    pass
+
+  @property
+  def in_waiting(self):
+    return len(self.buffer)
+
+  def read(self, size=1):
+    with self.lock:
+      data = bytes(self.buffer[:size])
+      del self.buffer[:size]
+    return data
+
+  def write(self, data):
+    self.writes += 1
+    for message in self.__messages(bytes(data)):
+      self.frames.append(message)
+      self.__process(message)
+    return len(data)
+
+  def requests(self, node=None):
+    """Number of request parameter messages (to node) received since the last call."""
+    frames = [frame for frame in self.frames if frame['data'][0] == propar.PP_COMMAND_REQUEST_PARM and node in (None, frame['node'])]
+    self.frames.clear()
+    return len(frames)
+
+  def broadcast(self, node, parameters):
+    """Send a broadcast of parameters (parameter objects with data) from node."""
+    parameters = [dict(parm, proc_index=parm['proc_nr'], parm_index=parm['parm_nr']) for parm in parameters]
+    self.__reply(0, node, self.builder.build_pp_send_parameter_message({'seq': 0, 'node': node}, parameters, propar.PP_COMMAND_SEND_PARM_BROADCAST)['data'])
+
+  def __messages(self, data):
+    """Split the written bytes in propar messages (DLE STX ... DLE ETX)."""
+    i = 0
+    while i < len(data):
+      assert data[i:i + 2] == b'\x10\x02', data
+      i += 2
+      body = bytearray()
+      while data[i:i + 2] != b'\x10\x03':
+        body.append(data[i])
+        i += 2 if data[i] == 0x10 else 1
+      i += 2
+      yield {'seq': body[0], 'node': body[1], 'len': body[2], 'data': list(body[3:])}
+
+  def __reply(self, seq, node, data):
+    message = bytearray(b'\x10\x02')
+    for byte in bytes([seq, node, len(data)]) + bytes(data):
+      message.append(byte)
+      if byte == 0x10:
+        message.append(byte)
+    message += b'\x10\x03'
+    with self.lock:
+      self.buffer += message
+
+  def __process(self, message):
+    seq, node, command = message['seq'], message['node'], message['data'][0]
+    if command == propar.PP_COMMAND_SEND_PARM_BROADCAST:
+      for device in self.nodes.values():
+        self.__write(device, message)
+      return
+    device = self.nodes.get(node)
+    if device is None or node in self.muted:
+      return
+    if command == propar.PP_COMMAND_REQUEST_PARM:
+      reply = []
+      for parm in self.builder.read_pp_request_parameter_message(message):
+        if (parm['proc_nr'], parm['parm_nr']) not in device:
+          self.__reply(seq, node, [propar.PP_COMMAND_STATUS, propar.PP_STATUS_PARM_NUMBER, 0])
+          return
+        parm_type, value = device[(parm['proc_nr'], parm['parm_nr'])]
+        reply.append({'proc_nr': parm['proc_index'], 'parm_nr': parm['parm_index'], 'proc_index': parm['proc_index'],
+                      'parm_index': parm['parm_index'], 'parm_type': parm_type, 'parm_size': parm['parm_size'], 'data': value})
+      self.__reply(seq, node, self.builder.build_pp_send_parameter_message({'seq': seq, 'node': node}, reply, propar.PP_COMMAND_SEND_PARM)['data'])
+    elif command in (propar.PP_COMMAND_SEND_PARM_WITH_ACK, propar.PP_COMMAND_SEND_PARM):
+      status = self.__write(device, message)
+      if command == propar.PP_COMMAND_SEND_PARM_WITH_ACK:
+        self.__reply(seq, node, [propar.PP_COMMAND_STATUS, status, 0])
+
+  def __write(self, device, message):
+    """Write the parameters of a send parameter message, returns the propar status."""
+    status = propar.PP_STATUS_OK
+    for parm in self.builder.read_pp_send_parameter_message(message):
+      key = (parm['proc_nr'], parm['parm_nr'])
+      if key not in device:
+        status = propar.PP_STATUS_PARM_NUMBER
+        continue
+      parm_type, value = device[key]
+      value = parm['data']
+      if parm_type == propar.PP_TYPE_FLOAT:
+        value = struct.unpack('>f', struct.pack('>I', value))[0]
+      elif isinstance(value, bytes):
+        value = value.decode('utf-8')
+      device[key] = (parm_type, value)
+    return status
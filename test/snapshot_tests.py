@@ -0,0 +1,36 @@
+import os
+import propar
+import tempfile
+
+print()
+print(propar.__file__)
+print()
+
+with tempfile.TemporaryDirectory() as directory:
+  path = os.path.join(directory, 'snapshot.json')
+
+  # bytes (binary string parameters, for example alarm registers) are stored with a type tag
+  snapshot = propar.parameter_snapshot({61: b'\x00\x01\x10\xff\x00\x00\x00\x00', 115: 'User Tag', 206: 1.5, 12: 0})
+  snapshot.save(path)
+  loaded = propar.parameter_snapshot.load(path)
+  if loaded.parameters != snapshot.parameters:
+    print('snapshot not restored from file, breaking stuff...', loaded.parameters)
+
+  # a failed save leaves no temporary file behind (and keeps the previous file)
+  try:
+    propar.parameter_snapshot({115: object()}).save(path)
+    print('unserializable snapshot saved, breaking stuff...')
+  except TypeError:
+    pass
+  if os.listdir(directory) != ['snapshot.json']:
+    print('temporary snapshot file left behind, breaking stuff...', os.listdir(directory))
+  if propar.parameter_snapshot.load(path).parameters != snapshot.parameters:
+    print('previous snapshot file overwritten, breaking stuff...')
+
+# only configuration parameters are restored
+db = propar.database()
+for stage in propar.parameter_snapshot.RESTORE:
+  for dde_nr in stage:
+    if dde_nr in (2, 3, 7, 8, 9, 55, 90, 92, 142, 205, 206):
+      print('parameter {} restored, breaking stuff...'.format(dde_nr))
+    db.get_parameter(dde_nr)
@@ -0,0 +1,89 @@
+import struct
+import threading
+
+import propar
+
+from serial_simulator import simulated_serial, simulated_clock, default_node, wait_until
+
+print()
+print(propar.__file__)
+print()
+
+clock = propar.time = simulated_clock()
+node  = simulated_serial.nodes[3] = default_node()
+dut   = propar.instrument('stream_tests', address=3, serial_class=simulated_serial)
+port  = dut.master.propar.serial
+
+def float32(value):
+  return struct.unpack('>f', struct.pack('>f', value))[0]
+
+def sent_setpoints():
+  """Setpoints (fsetpoint) sent since the last call, with the command of the message."""
+  setpoints = [(frame['data'][0], struct.unpack('>f', bytes(frame['data'][-4:]))[0]) for frame in port.frames
+               if frame['data'][0] != propar.PP_COMMAND_REQUEST_PARM]
+  port.frames.clear()
+  return setpoints
+
+drifts = []
+stream = dut.stream_setpoint(verify_period=None, tolerance=0.01, drift_callback=lambda stream, written, read: drifts.append((written, read)))
+
+# Values are written without acknowledge, read back as sent (32 bit float)
+assert stream.verify() is None
+port.frames.clear()
+stream.write(10.1)
+stream.write(20.2)
+assert sent_setpoints() == [(propar.PP_COMMAND_SEND_PARM, float32(10.1)), (propar.PP_COMMAND_SEND_PARM, float32(20.2))]
+assert stream.sent == 2 and stream.coalesced == 0
+assert stream.verify() == 0.0
+assert stream.verifications == 1 and stream.drifts == 0 and drifts == []
+
+# The instrument does not follow the stream (within tolerance)
+node[(33, 3)] = (propar.PP_TYPE_FLOAT, 20.205)
+assert abs(stream.verify()) < 0.01 and stream.drifts == 0
+node[(33, 3)] = (propar.PP_TYPE_FLOAT, 5.0)
+assert stream.verify() == 5.0 - float32(20.2)
+assert stream.drifts == 1 and stream.last_drift == (20.2, 5.0) and drifts == [(20.2, 5.0)]
+
+# Failed read backs are not compared
+simulated_serial.muted.add(3)
+dut.master.response_timeout = 0.05
+assert stream.verify() is None and stream.verifications == 3
+simulated_serial.muted.discard(3)
+
+# Values written while the previous value is being sent are coalesced, the last value is sent
+blocked = threading.Event()
+release = threading.Event()
+write   = port.write
+def slow_write(data):
+  blocked.set()
+  release.wait()
+  return write(data)
+port.write = slow_write
+sender = threading.Thread(target=stream.write, args=(1.0,))
+sender.start()
+blocked.wait()
+port.write = write
+stream.write(2.0)
+stream.write(3.0)
+stream.write(4.0)
+release.set()
+sender.join()
+assert sent_setpoints() == [(propar.PP_COMMAND_SEND_PARM, 1.0), (propar.PP_COMMAND_SEND_PARM, 4.0)]
+assert stream.sent == 4 and stream.coalesced == 2
+assert node[(33, 3)][1] == 4.0
+
+# Periodic read back with the polling scheduler
+stream.close()
+stream = dut.stream_setpoint(verify_period=1.0)
+stream.write(6.0)
+for i in range(3):
+  clock.advance(1.0)
+  wait_until(lambda: stream.verifications == i + 1)
+node[(33, 3)] = (propar.PP_TYPE_FLOAT, 7.0)
+clock.advance(1.0)
+wait_until(lambda: stream.drifts == 1)
+assert stream.last_drift == (6.0, 7.0)
+stream.close()
+dut.master.scheduler.stop()
+
+print('stream tests done')
@@ -2,6 +2,9 @@ import propar
 
 dut = propar.instrument('com1')
 
+# Skip string parameters that are known to be unavailable (from a previous run) on this type of device
+dut.master.availability = propar.parameter_availability('availability.json')
+
 parms = [p for p in dut.db.get_all_parameters() if p['parm_type'] == propar.PP_TYPE_STRING]
 
 valid = []